@@ -1,11 +1,20 @@
-import requests
+import argparse
 import os
-import subprocess
-import shutil
 import json
 import time
 from dotenv import load_dotenv
 
+from artifact_store import ArtifactStore, session_name
+from command_executor import CommandExecutor, format_result, split_commands
+from conversation_context import ConversationContext
+from file_validator import FileValidator
+from openrouter_client import DEFAULT_MODEL, OpenRouterClient
+from response_cache import ReplayLog, ResponseCache
+from response_parser import CommandBlock, FileBlock, ResponseParser, UnclosedBlock, parse_response
+from session_journal import JOURNAL_DIR_NAME, SessionJournal, Transcript, find_journal
+from tracing import Tracer
+from turn_pipeline import TurnPipeline
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -54,60 +63,130 @@ OUTPUT_DIR = ALLOWED_DIRS[0]
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
+# Structured tracing: JSONL span log, Prometheus text file and/or a local /metrics endpoint
+TRACE_FILE = os.getenv("TWINS_TRACE_FILE")
+METRICS_FILE = os.getenv("TWINS_METRICS_FILE")
+METRICS_PORT = os.getenv("TWINS_METRICS_PORT")
+
+tracer = Tracer(TRACE_FILE, METRICS_FILE)
+if METRICS_PORT:
+    tracer.serve_metrics(int(METRICS_PORT))
+
+
+# Versioned, deduplicating store for every generated file
+ARTIFACT_DIR = os.path.join(OUTPUT_DIR, ".artifacts")
+artifact_store = ArtifactStore(ARTIFACT_DIR)
+
 
 # Create file with content
-def create_file_with_content(filename, content):
+def create_file_with_content(filename, content, output_dir=None):
     """Create a file with specified content in the output directory"""
-    try:
-        file_path = os.path.join(OUTPUT_DIR, filename)
+    session = output_dir or OUTPUT_DIR
+    with tracer.span("file_write", session=session, filename=filename, chars=len(content)) as span:
+        try:
+            file_path = os.path.realpath(os.path.join(session, filename))
+            if os.path.commonpath([file_path, os.path.realpath(session)]) != os.path.realpath(session):
+                raise ValueError("path escapes the output directory")
+
+            # Earlier versions stay restorable from the artifact store; identical content is a no-op
+            version, changed = artifact_store.save(
+                session_name(session, OUTPUT_DIR), session, filename, content
+            )
+            # Versions stay in the trace and manifest; the transcript text must not depend on earlier runs
+            span["version"] = version
+            span["changed"] = changed
+            return f"Successfully created {filename} with {len(content)} characters"
+        except Exception as e:
+            span["failed"] = True
+            return f"Error creating file {filename}: {str(e)}"
+
+
+# Background checks on every generated file: syntax, import smoke test and whitelisted linters
+FILE_CHECKS = os.getenv("TWINS_FILE_CHECKS")  # Comma-separated subset, e.g. "syntax,import"
+FILE_CHECK_TIMEOUT = float(os.getenv("TWINS_FILE_CHECK_TIMEOUT", "20"))
+FILE_CHECK_MAX_PARALLEL = int(os.getenv("TWINS_FILE_CHECK_MAX_PARALLEL", "4"))
+
+file_validator = FileValidator(
+    ALLOWED_COMMANDS,
+    checks=FILE_CHECKS.split(",") if FILE_CHECKS else None,
+    timeout=FILE_CHECK_TIMEOUT,
+    max_workers=FILE_CHECK_MAX_PARALLEL,
+)
 
-        # Ensure we're not overwriting important files
-        if os.path.exists(file_path):
-            backup_path = f"{file_path}.backup"
-            shutil.copy2(file_path, backup_path)
-            print(f"Backed up existing file to {backup_path}")
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+def check_created_file(filename, content, output_dir, write_result):
+    """Start checking a file that was just written; None if the write failed"""
+    if not write_result.startswith("Successfully"):
+        return None
+    return file_validator.submit(os.path.join(output_dir or OUTPUT_DIR, filename), content)
 
-        return f"Successfully created {filename} with {len(content)} characters"
-    except Exception as e:
-        return f"Error creating file {filename}: {str(e)}"
+
+# Command execution limits: wall-clock seconds, bytes of output kept per stream, parallel commands
+COMMAND_TIMEOUT = float(os.getenv("TWINS_COMMAND_TIMEOUT", "120"))
+COMMAND_MAX_OUTPUT = int(os.getenv("TWINS_COMMAND_MAX_OUTPUT", str(16 * 1024)))
+COMMAND_MAX_PARALLEL = int(os.getenv("TWINS_COMMAND_MAX_PARALLEL", "4"))
+
+command_executor = CommandExecutor(
+    ALLOWED_COMMANDS,
+    ALLOWED_DIRS,
+    timeout=COMMAND_TIMEOUT,
+    max_output=COMMAND_MAX_OUTPUT,
+    max_parallel=COMMAND_MAX_PARALLEL,
+)
 
 
 # Execute system command safely
-def execute_command(command, is_destructive=False):
+def execute_command(command, is_destructive=False, output_dir=None):
     if not command:
         return "Error: No command provided."
+    return execute_commands([command], is_destructive, output_dir)[0]
 
-    # Check if command is allowed
-    cmd_parts = command.split()
-    if not cmd_parts or cmd_parts[0] not in ALLOWED_COMMANDS:
-        return f"Error: Command '{cmd_parts[0] if cmd_parts else ''}' not in whitelist: {ALLOWED_COMMANDS}"
-
-    # Restrict to allowed directories (but allow creating new files/folders)
-    restricted_paths = []
-    for arg in cmd_parts[1:]:  # Skip the command itself
-        if os.path.exists(arg):
-            abs_arg = os.path.abspath(arg)
-            if not any(abs_arg.startswith(os.path.abspath(d)) for d in ALLOWED_DIRS):
-                restricted_paths.append(arg)
-
-    if restricted_paths:
-        return f"Error: Access restricted to {ALLOWED_DIRS}. Attempted to access: {restricted_paths}"
 
+def execute_commands(commands, is_destructive=False, output_dir=None):
+    """Run bash blocks, parallelizing consecutive read-only lines across them; returns one result per block"""
     # Log destructive actions but execute automatically
     if is_destructive:
-        print(f"Warning: Executing destructive command: '{command}'")
+        print(f"Warning: Executing destructive commands: {commands}")
         # AIs operate autonomously - no user confirmation required
 
-    try:
-        result = subprocess.run(
-            command, shell=True, capture_output=True, text=True, cwd=OUTPUT_DIR
-        )
-        return result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
-    except Exception as e:
-        return f"Error executing command: {str(e)}"
+    lines = []
+    owners = []
+    for block_index, block in enumerate(commands):
+        for line in split_commands(block):
+            lines.append(line)
+            owners.append(block_index)
+
+    session = output_dir or OUTPUT_DIR
+    with tracer.span("commands", session=session, count=len(lines)):
+        results = command_executor.run_all(lines, session)
+        for result in results:
+            tracer.record(
+                "command",
+                result.duration,
+                session=session,
+                command=result.command[:200],
+                exit_code=result.exit_code,
+                timed_out=result.timed_out,
+                rejected=bool(result.error),
+            )
+    outputs = [[] for _ in commands]
+    for block_index, result in zip(owners, results):
+        outputs[block_index].append(result)
+
+    formatted = []
+    for block_results in outputs:
+        if not block_results:
+            formatted.append("Error: No command provided.")
+        elif len(block_results) == 1:
+            formatted.append(format_result(block_results[0], command_executor.timeout))
+        else:
+            formatted.append(
+                "\n".join(
+                    f"$ {r.command} (exit {r.exit_code})\n{format_result(r, command_executor.timeout)}"
+                    for r in block_results
+                )
+            )
+    return formatted
 
 
 ## Query Ollama API removed
@@ -115,128 +194,356 @@ def execute_command(command, is_destructive=False):
 
 # OpenRouter API configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-
-
-def get_openrouter_response(prompt, model="tngtech/deepseek-r1t2-chimera:free"):
-    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY.strip() == "":
-        raise ValueError("OpenRouter API key is missing. Please set the OPENROUTER_API_KEY environment variable.")
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    data = {
-        "model": model,
-        "messages": [{"role": "user", "content": prompt}],
-    }
-    try:
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.Timeout:
-        raise ValueError("The request to OpenRouter timed out. Please try again later.")
-    except requests.exceptions.RequestException as e:
-        raise ValueError(f"An error occurred while communicating with OpenRouter: {e}")
-    return response.json()["choices"][0]["message"]["content"]
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "10"))
+OPENROUTER_READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "60"))
+
+# Optional response cache and record/replay log (replay mode never touches the network)
+OPENROUTER_CACHE_DIR = os.getenv("OPENROUTER_CACHE_DIR")
+OPENROUTER_CACHE_MAX_ENTRIES = int(os.getenv("OPENROUTER_CACHE_MAX_ENTRIES", "1000"))
+OPENROUTER_CACHE_MAX_AGE = os.getenv("OPENROUTER_CACHE_MAX_AGE")  # Seconds
+OPENROUTER_REPLAY_FILE = os.getenv("OPENROUTER_REPLAY_FILE")
+OPENROUTER_REPLAY_MODE = os.getenv("OPENROUTER_REPLAY_MODE", "replay")
+
+response_cache = None
+if OPENROUTER_CACHE_DIR:
+    response_cache = ResponseCache(
+        os.path.expanduser(OPENROUTER_CACHE_DIR),
+        max_entries=OPENROUTER_CACHE_MAX_ENTRIES,
+        max_age=float(OPENROUTER_CACHE_MAX_AGE) if OPENROUTER_CACHE_MAX_AGE else None,
+    )
+replay_log = None
+if OPENROUTER_REPLAY_FILE:
+    replay_log = ReplayLog(os.path.expanduser(OPENROUTER_REPLAY_FILE), OPENROUTER_REPLAY_MODE)
+
+# One pooled client so every turn reuses the same TLS/keep-alive connections
+openrouter_client = OpenRouterClient(
+    OPENROUTER_API_KEY,
+    OPENROUTER_URL,
+    connect_timeout=OPENROUTER_CONNECT_TIMEOUT,
+    read_timeout=OPENROUTER_READ_TIMEOUT,
+    cache=response_cache,
+    replay=replay_log,
+)
+
+
+def get_openrouter_response(prompt, model=DEFAULT_MODEL, on_token=None, messages=None):
+    """Stream a completion for prompt (or a full messages array), passing each token to on_token"""
+    if messages is None:
+        messages = [{"role": "user", "content": prompt}]
+    with tracer.span("llm", model=model, messages=len(messages)) as span:
+        stream = openrouter_client.stream(messages, model=model)
+        for token in stream:
+            if on_token:
+                on_token(token)
+        span["ttft"] = stream.ttft
+        span["cached"] = stream.cached
+        for field in ("prompt_tokens", "completion_tokens"):
+            span[field] = (stream.usage or {}).get(field)
+    if on_token and stream.ttft is not None:
+        print(f"\n[time to first token: {stream.ttft:.2f}s, total: {stream.duration:.2f}s]")
+    return stream.text
+
+
+# Act on a parsed response event as soon as it is complete
+def handle_response_event(event, turns, commands):
+    if isinstance(event, FileBlock):
+        if event.filename and event.filename.endswith(".py"):
+            turns.submit_file(event.filename, event.content)
+        elif event.language == "python":
+            print(f"\nWarning: Invalid or missing filename: {event.filename}")
+    elif isinstance(event, CommandBlock):
+        commands.append(event.command)
+    elif isinstance(event, UnclosedBlock):
+        print("\nWarning: Could not find end of code block")
+
+
+def record_turn_results(conversation, context, file_results, command_results, journal=None, turn=None, echo=True):
+    """Add a turn's side-effect results to the transcript and context, journaling them under turn"""
+    if journal and (file_results or command_results):
+        journal.append({"type": "results", "turn": turn, "files": file_results, "commands": command_results})
+    for filename, file_result in file_results:
+        conversation.append(f"File Creation Result: {file_result}")
+        context.add_result("File Creation Result", file_result)
+        if file_result.startswith("Successfully"):
+            context.add_file(filename)
+        if echo:
+            print(f"File Creation Result: {file_result}")
+    for command_result in command_results:
+        conversation.append(f"Command Result: {command_result}")
+        context.add_result("Command Result", command_result)
+        if echo:
+            print(f"Command Result: {command_result}")
 
 
-# Main conversation loop with task execution
-def ai_conversation(problem, max_turns=None, use_speech=False):
-    ai1_name = "Analytica"  # Analytical, methodical AI
-    ai2_name = "Creativa"  # Creative, out-of-the-box AI
-    conversation = [f"Problem to solve: {problem}"]
-    current_speaker = ai1_name
-    turn = 0
+def restore_from_journal(journal, conversation, context, turns):
+    """Replay a journal into the transcript and context and resubmit the last turn's unfinished side effects.
+
+    Returns (last turn record, final response); either is None if not reached yet.
+    """
+    last = None
+    final = None
+    collected_files = 0
+    collected_commands = False
+    for record in journal.records():
+        if record["type"] == "results":
+            record_turn_results(conversation, context, record["files"], record["commands"], echo=False)
+            collected_files += len(record["files"])
+            collected_commands = collected_commands or bool(record["commands"])
+        elif record["type"] == "turn":
+            conversation.append(f"{record['speaker']}: {record['response']}")
+            context.add_message(record["speaker"], record["response"])
+            last = record
+            collected_files = 0
+            collected_commands = False
+        elif record["type"] == "final":
+            final = record["response"]
+
+    # Only the last turn can have results still outstanding when the session stopped
+    if last and final is None:
+        files = [
+            event
+            for event in parse_response(last["response"])
+            if isinstance(event, FileBlock) and event.filename and event.filename.endswith(".py")
+        ]
+        for event in files[collected_files:]:
+            turns.submit_file(event.filename, event.content)
+        if last["commands"] and not collected_commands:
+            turns.submit_commands(last["commands"], "destructive" in last["response"].lower())
+        turns.end_turn()
+    return last, final
+
+
+# Token budget for the conversation history sent with each turn
+CONTEXT_TOKEN_BUDGET = int(os.getenv("TWINS_CONTEXT_TOKENS", "6000"))
+
+# Pipelined mode overlaps a turn's file writes and commands with the next LLM request.
+# The wait policy says what the next prompt must see first: "commands", "files" or "none".
+PIPELINED_TURNS = os.getenv("TWINS_PIPELINED", "").lower() in ("1", "true", "yes")
+PIPELINE_WAIT_FOR = os.getenv("TWINS_PIPELINE_WAIT_FOR", "commands")
+
+# Turns before the final summary, unless ai_conversation is given max_turns
+MAX_TURNS = int(os.getenv("TWINS_MAX_TURNS", "4"))  # Reduced for faster demo
+
+# Transcript entries kept in memory; older ones are spilled to a temporary file
+TRANSCRIPT_MEMORY_ENTRIES = int(os.getenv("TWINS_TRANSCRIPT_MEMORY_ENTRIES", "200"))
+
+
+def print_token(token):
+    print(token, end="", flush=True)
 
-    print(f"Starting conversation to solve: {problem}\n")
-
-    while True:
-        prompt = f"{current_speaker}, respond to {ai2_name if current_speaker == ai1_name else ai1_name}'s previous message. CREATE a working Python tool or script that can generate revenue. Use 'filename: script_name.py' followed by ```python code ```. Include setup commands with ```bash commands ```. Focus on quick wins with high revenue potential ($50-500/month). If solution is complete, say 'SOLUTION_COMPLETE'."
-        response = get_openrouter_response(prompt)
-
-        # Handle API errors gracefully
-        if "Error:" in response:
-            print(f"API Error encountered: {response}")
-            print("Continuing despite error...")
-
-        conversation.append(f"{current_speaker}: {response}")
-        print(conversation[-1])
-
-        # Check for file creation with content
-        if "```python" in response:
-            try:
-                # Extract filename - handle multiple formats
-                lines = response.split("\n")
-                filename = None
-                for line in lines:
-                    line_lower = line.lower()
-                    if "filename:" in line_lower:
-                        # Handle various formats: filename: file.py, **filename: file.py**, `filename: file.py`
-                        filename_part = line.split(":")[1].strip()
-                        filename = (
-                            filename_part.replace("*", "").replace("`", "").strip()
-                        )
-                        break
-
-                if filename and filename.endswith(".py"):
-                    # Extract Python code between ```python and ```
-                    code_blocks = response.split("```python")
-                    if len(code_blocks) > 1:
-                        code_part = code_blocks[1]
-                        code_end = code_part.find("```")
-                        if code_end > 0:
-                            code_content = code_part[:code_end].strip()
-                            file_result = create_file_with_content(
-                                filename, code_content
-                            )
-                            conversation.append(f"File Creation Result: {file_result}")
-                            print(f"File Creation Result: {file_result}")
-                        else:
-                            print("Warning: Could not find end of code block")
-                    else:
-                        print("Warning: Could not find Python code block")
-                else:
-                    print(f"Warning: Invalid or missing filename: {filename}")
-            except Exception as e:
-                print(f"Error processing file creation: {e}")
-
-        # Check for command in response
-        if "```bash" in response:
-            command = response.split("```bash\n")[1].split("```")[0].strip()
-            is_destructive = "destructive" in response.lower()
-            command_result = execute_command(command, is_destructive)
-            conversation.append(f"Command Result: {command_result}")
-            print(f"Command Result: {command_result}")
 
-        # Check if solution is complete (only after minimum turns)
-        if "SOLUTION_COMPLETE" in response and turn >= 2:
-            print(
-                f"\n{current_speaker} indicates the solution is complete. Moving to final summary...\n"
+# Main conversation loop with task execution
+def ai_conversation(
+    problem,
+    max_turns=None,
+    use_speech=False,
+    output_dir=None,
+    stream_output=True,
+    pipelined=PIPELINED_TURNS,
+    wait_for=PIPELINE_WAIT_FOR,
+    journal=None,
+):
+    session = output_dir or OUTPUT_DIR
+    max_turns = max_turns or MAX_TURNS
+    resumed = journal is not None
+    if not resumed:
+        journal = SessionJournal.create(os.path.join(session, JOURNAL_DIR_NAME))
+        journal.append(
+            {
+                "type": "start",
+                "problem": problem,
+                "output_dir": output_dir,
+                "pipelined": pipelined,
+                "wait_for": wait_for,
+                "max_turns": max_turns,
+            },
+            sync=True,
+        )
+    print(f"Session journal: {journal.path} (resume with: python app.py --resume {journal.session_id})")
+    try:
+        with tracer.context(session=session), tracer.span("conversation", pipelined=pipelined, resumed=resumed):
+            conversation = _run_conversation(
+                problem, output_dir, stream_output, pipelined, wait_for, max_turns, journal
             )
-            break
-
-        # Limit maximum turns to prevent infinite loops
-        if turn >= 3:  # Reduced for faster demo
-            print(f"\nReached maximum turns ({turn}). Moving to final summary...\n")
-            break
+    finally:
+        journal.close()
+        # Crashed runs are the ones most worth looking at, so always refresh the metrics file
+        tracer.write_metrics()
+    return conversation
 
-        current_speaker = ai2_name if current_speaker == ai1_name else ai1_name
-        turn += 1
 
-        # Small delay for readability
-        time.sleep(1)
+def resume_conversation(session, stream_output=True):
+    """Continue a crashed or interrupted session from its journal without repeating finished LLM calls"""
+    journal = SessionJournal(find_journal(session, OUTPUT_DIR))
+    start = journal.start_record()
+    if not start or start["type"] != "start":
+        journal.close()
+        raise ValueError(f"Journal {journal.path} has no start record")
+    print(f"Resuming session {journal.session_id}")
+    return ai_conversation(
+        start["problem"],
+        output_dir=start["output_dir"],
+        stream_output=stream_output,
+        pipelined=start["pipelined"],
+        wait_for=start["wait_for"],
+        max_turns=start.get("max_turns"),
+        journal=journal,
+    )
+
+
+def _run_conversation(problem, output_dir, stream_output, pipelined, wait_for, max_turns, journal):
+    ai1_name = "Analytica"  # Analytical, methodical AI
+    ai2_name = "Creativa"  # Creative, out-of-the-box AI
+    conversation = Transcript(keep=TRANSCRIPT_MEMORY_ENTRIES)
+    conversation.append(f"Problem to solve: {problem}")
+    context = ConversationContext(problem, token_budget=CONTEXT_TOKEN_BUDGET)
+    # Without pipelining, side effects run inline and every prompt sees all previous results
+    turns = TurnPipeline(
+        create_file_with_content,
+        execute_commands,
+        output_dir,
+        wait_for=wait_for if pipelined else "commands",
+        background=pipelined,
+        check_file=check_created_file,
+    )
+    current_speaker = ai1_name
+    turn = 0
+    pending_turn = None  # Turn whose side-effect results are still to be collected
+    done = False
+    last, final_response = restore_from_journal(journal, conversation, context, turns)
+    if last:
+        current_speaker = ai2_name if last["speaker"] == ai1_name else ai1_name
+        pending_turn = last["turn"]
+        turn = pending_turn + 1
+        done = last["done"]
+        print(f"Restored {turn} completed turns from the journal\n")
+    else:
+        print(f"Starting conversation to solve: {problem}\n")
 
-    # Final summary by Analytica
-    prompt = f"{ai1_name}, provide a comprehensive business summary including: 1) All products created, 2) Revenue projections and pricing strategy, 3) Marketing/distribution plan, 4) Next steps for monetization. Final solution for: {problem}"
-    final_response = get_openrouter_response(prompt)
+    try:
+        while not done and final_response is None:
+            with tracer.span("turn", turn=turn, speaker=current_speaker):
+                prompt = f"{current_speaker}, respond to {ai2_name if current_speaker == ai1_name else ai1_name}'s previous message. CREATE a working Python tool or script that can generate revenue. Use 'filename: script_name.py' followed by ```python code ```. Include setup commands with ```bash commands ```. Focus on quick wins with high revenue potential ($50-500/month). If solution is complete, say 'SOLUTION_COMPLETE'."
+                # Wait only for the previous turn's results this prompt depends on
+                with tracer.span("wait"):
+                    record_turn_results(conversation, context, *turns.collect_for_prompt(), journal, pending_turn)
+                messages = context.build_messages(current_speaker, prompt)
+                parser = ResponseParser()
+                commands = []
+                parse_seconds = [0.0]
+
+                def on_token(token):
+                    if stream_output:
+                        print_token(token)
+                    started = time.perf_counter()
+                    for event in parser.feed(token):
+                        handle_response_event(event, turns, commands)
+                    parse_seconds[0] += time.perf_counter() - started
+
+                if stream_output:
+                    print(f"{current_speaker}: ", end="", flush=True)
+                response = get_openrouter_response(prompt, on_token=on_token, messages=messages)
+                for event in parser.close():
+                    handle_response_event(event, turns, commands)
+                # Parsing ran inside the token callbacks, so it overlaps the llm span
+                tracer.record("parse", parse_seconds[0], parent="llm", chars=len(response))
+                if not stream_output:
+                    print(f"{current_speaker}: {response}")
+
+                # The rest of the previous turn's results go before this response in the transcript
+                with tracer.span("wait"):
+                    record_turn_results(conversation, context, *turns.collect_all(), journal, pending_turn)
+
+                # Handle API errors gracefully
+                if "Error:" in response:
+                    print(f"API Error encountered: {response}")
+                    print("Continuing despite error...")
+
+                conversation.append(f"{current_speaker}: {response}")
+                context.add_message(current_speaker, response)
+
+                # Check if solution is complete (only after minimum turns), capped to prevent infinite loops
+                solved = parser.completed and turn >= 2
+                done = solved or turn >= max_turns - 1
+                journal.append(
+                    {
+                        "type": "turn",
+                        "turn": turn,
+                        "speaker": current_speaker,
+                        "prompt": prompt,
+                        "response": response,
+                        "files": turns.current_files(),
+                        "commands": commands,
+                        "done": done,
+                    },
+                    sync=True,
+                )
+
+                # Run commands once the full response is in, since they may use files from later blocks
+                if commands:
+                    is_destructive = "destructive" in response.lower()
+                    turns.submit_commands(commands, is_destructive)
+                pending_turn = turn
+                turns.end_turn()
+
+                if solved:
+                    print(
+                        f"\n{current_speaker} indicates the solution is complete. Moving to final summary...\n"
+                    )
+                    break
+                if done:
+                    print(f"\nReached maximum turns ({turn}). Moving to final summary...\n")
+                    break
+
+                current_speaker = ai2_name if current_speaker == ai1_name else ai1_name
+                turn += 1
+
+                # Small delay for readability
+                if not pipelined:
+                    with tracer.span("sleep"):
+                        time.sleep(1)
+
+        with tracer.span("wait"):
+            record_turn_results(conversation, context, *turns.collect_all(), journal, pending_turn)
+    except BaseException:
+        # Journal side effects that already ran, so --resume does not run them again
+        try:
+            record_turn_results(conversation, context, *turns.collect_all(), journal, pending_turn)
+        except Exception as e:
+            print(f"Could not record the previous turn's results: {e}")
+        raise
+    finally:
+        turns.close()
+
+    # Final summary by Analytica, unless the journal already has it
+    if final_response is None:
+        prompt = f"{ai1_name}, provide a comprehensive business summary including: 1) All products created, 2) Revenue projections and pricing strategy, 3) Marketing/distribution plan, 4) Next steps for monetization. Final solution for: {problem}"
+        messages = context.build_messages(ai1_name, prompt)
+        if stream_output:
+            print(f"\n{ai1_name} (Final Solution): ", end="", flush=True)
+            final_response = get_openrouter_response(prompt, on_token=print_token, messages=messages)
+        else:
+            final_response = get_openrouter_response(prompt, messages=messages)
+            print(f"\n{ai1_name} (Final Solution): {final_response}")
+        journal.append({"type": "final", "response": final_response}, sync=True)
     conversation.append(f"{ai1_name} (Final Solution): {final_response}")
-    print(f"\n{conversation[-1]}")
 
     return conversation
 
 
 # Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Let two AIs collaborate on building sellable Python tools")
+    parser.add_argument("--resume", metavar="SESSION", help="Continue a session from its journal (id or path)")
+    args = parser.parse_args()
+
     # High-probability money-making focus
     problem = "Create and package profitable Python tools or automation scripts that can be sold online for recurring revenue. Target high-demand niches like productivity automation, data processing, or business tools. Include pricing strategy and distribution plan."
     print("Starting AI collaboration with OpenRouter...")
-    ai_conversation(problem, max_turns=None, use_speech=False)
+    if args.resume:
+        resume_conversation(args.resume)
+    else:
+        ai_conversation(problem, max_turns=None, use_speech=False)
+    if response_cache:
+        print(f"Response cache: {response_cache.stats()}")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+
+
+def current_umask():
+    # os.umask can only be read by setting it, so do it once while the process is single-threaded
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = current_umask()
+
+
+def working_file_mode(path):
+    """Mode for a new version of path: keep the existing file's (e.g. after chmod +x), else what open() would give"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+def atomic_write(path, data, mode=None):
+    """Write bytes to path via a temp file and rename, so readers never see a partial file.
+
+    The temp file is private (0600); pass mode to give the result other permissions.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def session_name(workdir, output_root):
+    """Manifest name for a working directory: its path relative to the output root.
+
+    Directories outside the root are named by a hash of their path instead.
+    """
+    workdir = os.path.realpath(workdir)
+    relative = os.path.relpath(workdir, os.path.realpath(output_root))
+    if relative == ".":
+        return "default"
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        digest = hashlib.sha256(workdir.encode("utf-8")).hexdigest()[:12]
+        label = re.sub(r"[^\w-]+", "_", os.path.basename(workdir))
+        return f"external__{label}-{digest}"
+    return re.sub(r"[^\w.-]+", "__", relative)
+
+
+class ArtifactStore:
+    """Content-addressed, versioned store for generated files.
+
+    Every distinct file content is stored once as a blob named by its SHA-256. Each
+    session keeps a manifest listing, per file, the blob of every version written,
+    so any earlier version can be restored without backing files up on each write.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.manifest_dir = os.path.join(root, "manifests")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifests = {}
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _manifest_path(self, session):
+        return os.path.join(self.manifest_dir, f"{session}.json")
+
+    def manifest(self, session):
+        if session not in self._manifests:
+            path = self._manifest_path(session)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    self._manifests[session] = json.load(f)
+            else:
+                self._manifests[session] = {"session": session, "files": {}}
+        return self._manifests[session]
+
+    def _save_manifest(self, session):
+        data = json.dumps(self.manifest(session), indent=2).encode("utf-8")
+        atomic_write(self._manifest_path(session), data)
+
+    def _put_blob(self, digest, data):
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, data)
+
+    def _snapshot_external(self, session, versions, file_path):
+        """Digest of the working file, first recording it as a version if it changed behind our back"""
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        latest = versions[-1] if versions else None
+        if latest and latest["size"] == stat.st_size and latest["mtime_ns"] == stat.st_mtime_ns:
+            return latest["sha256"]
+        with open(file_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if not latest or latest["sha256"] != digest:
+            # Edited by a command or created outside the store: keep it in the history
+            self._put_blob(digest, data)
+            self._record(session, versions, file_path, digest, len(data), external=True)
+        return digest
+
+    def save(self, session, workdir, filename, content):
+        """Write content to workdir/filename and record it; returns (version, changed)"""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        file_path = os.path.join(workdir, filename)
+        with self._lock:
+            versions = self.manifest(session)["files"].setdefault(filename, [])
+            if self._snapshot_external(session, versions, file_path) == digest:
+                return versions[-1]["version"], False
+            self._put_blob(digest, data)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            atomic_write(file_path, data, working_file_mode(file_path))
+            return self._record(session, versions, file_path, digest, len(data)), True
+
+    def _record(self, session, versions, file_path, digest, size, restored_from=None, external=False):
+        stat = os.stat(file_path)
+        entry = {
+            "version": len(versions) + 1,
+            "sha256": digest,
+            "size": size,
+            "mtime_ns": stat.st_mtime_ns,
+            "time": round(time.time(), 3),
+        }
+        if restored_from:
+            entry["restored_from"] = restored_from
+        if external:
+            entry["external"] = True
+        versions.append(entry)
+        self._save_manifest(session)
+        return entry["version"]
+
+    def history(self, session, filename=None):
+        files = self.manifest(session)["files"]
+        return files.get(filename, []) if filename else files
+
+    def read(self, session, filename, version=None):
+        versions = self.history(session, filename)
+        if not versions:
+            raise KeyError(f"No versions of {filename} in session {session}")
+        entry = versions[-1] if version is None else next(
+            (v for v in versions if v["version"] == version), None
+        )
+        if entry is None:
+            raise KeyError(f"{filename} has no version {version} in session {session}")
+        with open(self._blob_path(entry["sha256"]), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def restore(self, session, workdir, filename, version):
+        """Put an earlier version back in the working directory, recorded as a new version"""
+        content = self.read(session, filename, version)
+        data = content.encode("utf-8")
+        file_path = os.path.join(workdir, filename)
+        with self._lock:
+            versions = self.manifest(session)["files"][filename]
+            atomic_write(file_path, data, working_file_mode(file_path))
+            digest = hashlib.sha256(data).hexdigest()
+            return self._record(session, versions, file_path, digest, len(data), restored_from=version)
+
+    def sessions(self):
+        return sorted(name[: -len(".json")] for name in os.listdir(self.manifest_dir) if name.endswith(".json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and restore versions of generated files")
+    parser.add_argument("--root", default=os.path.expanduser("~/ai_tasks/.artifacts"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sessions", help="List sessions with recorded artifacts")
+    history = commands.add_parser("history", help="Show the versions recorded for a session")
+    history.add_argument("session")
+    history.add_argument("filename", nargs="?")
+    restore = commands.add_parser("restore", help="Restore a file version into a directory")
+    restore.add_argument("session")
+    restore.add_argument("filename")
+    restore.add_argument("version", type=int)
+    restore.add_argument("--to", required=True, help="Working directory to restore into")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root)
+    if args.command == "sessions":
+        print("\n".join(store.sessions()))
+    elif args.command == "history":
+        files = {args.filename: store.history(args.session, args.filename)} if args.filename else store.history(args.session)
+        for filename, versions in files.items():
+            print(filename)
+            for v in versions:
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["time"]))
+                print(f"  v{v['version']}  {stamp}  {v['size']:>8} bytes  {v['sha256'][:12]}")
+    else:
+        version = store.restore(args.session, args.to, args.filename, args.version)
+        print(f"Restored {args.filename} v{args.version} as v{version}")
+
+
+if __name__ == "__main__":
+    main()
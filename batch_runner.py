@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+DEFAULT_CONCURRENCY = int(os.getenv("TWINS_CONCURRENCY", "4"))
+
+
+# Give every session its own output directory so runs never collide on filenames
+def create_session_dir(index, problem, root=None):
+    slug = re.sub(r"[^a-z0-9]+", "-", problem.lower()).strip("-")[:40] or "problem"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{index:03d}-{slug}-{uuid.uuid4().hex[:6]}"
+    session_dir = os.path.join(root or app.OUTPUT_DIR, "sessions", name)
+    os.makedirs(session_dir)
+    return session_dir
+
+
+def run_session(index, problem, max_turns=None):
+    """Run one conversation in an isolated directory and save its transcript there"""
+    output_dir = create_session_dir(index, problem)
+    started = time.monotonic()
+    result = {"index": index, "problem": problem, "output_dir": output_dir}
+    try:
+        conversation = app.ai_conversation(
+            problem, max_turns=max_turns, output_dir=output_dir, stream_output=False
+        )
+        result["status"] = "completed"
+    except Exception as e:
+        conversation = []
+        result["status"] = "failed"
+        result["error"] = str(e)
+        print(f"Session {index} failed: {e}")
+    result["duration"] = round(time.monotonic() - started, 3)
+
+    with open(os.path.join(output_dir, "transcript.json"), "w", encoding="utf-8") as f:
+        json.dump({**result, "conversation": list(conversation)}, f, indent=2)
+    return result
+
+
+def run_batch(problems, concurrency=DEFAULT_CONCURRENCY, max_turns=None):
+    """Drive up to `concurrency` conversations at once; results come back in input order"""
+    # All sessions share the pooled client, so it needs a connection per worker
+    app.openrouter_client.set_pool_size(max(concurrency, 1))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_session, index, problem, max_turns)
+            for index, problem in enumerate(problems)
+        ]
+        return [future.result() for future in futures]
+
+
+def load_problems(path):
+    """Read problems from a text file (one per line) or JSONL ({"problem": ...} per line)"""
+    problems = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                problems.append(record["problem"] if isinstance(record, dict) else record)
+            else:
+                problems.append(line)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of Twins conversations concurrently")
+    parser.add_argument("problems", help="Text file with one problem per line, or a .jsonl file")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-turns", type=int, default=None)
+    args = parser.parse_args()
+
+    problems = load_problems(args.problems)
+    print(f"Running {len(problems)} problems with concurrency {args.concurrency}...")
+    results = run_batch(problems, args.concurrency, args.max_turns)
+
+    summary_path = os.path.join(app.OUTPUT_DIR, "sessions", f"batch-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    completed = sum(1 for r in results if r["status"] == "completed")
+    print(f"\n{completed}/{len(results)} sessions completed. Summary written to {summary_path}")
+    if app.response_cache:
+        print(f"Response cache: {app.response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
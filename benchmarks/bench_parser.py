@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_parser import ResponseParser  # noqa: E402
+
+BLOCK = """Here is the next tool.
+
+filename: tool_{i}.py
+```python
+import csv
+
+def process(rows):
+    return [row for row in rows if row.get("amount")]
+
+if __name__ == "__main__":
+    print(process([]))
+```
+```bash
+python tool_{i}.py
+```
+"""
+
+
+def build_response(target_bytes):
+    parts = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        block = BLOCK.format(i=i)
+        parts.append(block)
+        size += len(block)
+        i += 1
+    return "".join(parts) + "SOLUTION_COMPLETE\n"
+
+
+def bench(response, chunk_size, repeat=3):
+    best = None
+    for _ in range(repeat):
+        parser = ResponseParser()
+        events = 0
+        started = time.perf_counter()
+        for i in range(0, len(response), chunk_size):
+            events += len(parser.feed(response[i : i + chunk_size]))
+        events += len(parser.close())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "chunk_size": chunk_size,
+        "events": events,
+        "seconds": round(best, 4),
+        "mb_per_second": round(len(response) / best / 1e6, 2),
+    }
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    response = build_response(int(size_mb * 1e6))
+    results = [bench(response, chunk_size) for chunk_size in (16, 256, 4096, len(response))]
+    print(json.dumps({"benchmark": "response_parser", "bytes": len(response), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
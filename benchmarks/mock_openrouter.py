@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = """Here is a quick-win tool.
+
+filename: invoice_tool.py
+```python
+import csv
+import sys
+
+
+def total(path):
+    with open(path, newline="") as f:
+        return sum(float(row["amount"]) for row in csv.DictReader(f))
+
+
+if __name__ == "__main__":
+    print(total(sys.argv[1]) if len(sys.argv) > 1 else 0)
+```
+```bash
+python invoice_tool.py
+```
+Pricing: $19/month. SOLUTION_COMPLETE"""
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+
+    def do_POST(self):
+        mock = self.server.mock
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        request_number = mock.record(body)
+
+        if mock.rate_limit_every and request_number % mock.rate_limit_every == 0:
+            self.send_response(429)
+            self.send_header("Retry-After", str(mock.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        content = mock.next_response(body)
+        time.sleep(mock.latency)
+        usage = {
+            "prompt_tokens": sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+        if body.get("stream"):
+            self._stream(content, usage)
+        else:
+            self._complete(content, usage)
+
+    def _complete(self, content, usage):
+        mock = self.server.mock
+        if mock.tokens_per_second:
+            time.sleep(len(content) / 4 / mock.tokens_per_second)
+        payload = json.dumps({"choices": [{"message": {"content": content}}], "usage": usage}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, content, usage):
+        mock = self.server.mock
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk(b": OPENROUTER PROCESSING\n\n")
+        step = mock.chars_per_token
+        delay = 1 / mock.tokens_per_second if mock.tokens_per_second else 0
+        for i in range(0, len(content), step):
+            event = {"choices": [{"delta": {"content": content[i : i + step]}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if delay:
+                time.sleep(delay)
+        final = {"choices": [{"delta": {}, "finish_reason": "stop"}], "usage": usage}
+        self._chunk(f"data: {json.dumps(final)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockOpenRouter:
+    """Local stand-in for OPENROUTER_URL with configurable latency, token rate, 429s and canned responses"""
+
+    def __init__(
+        self,
+        responses=None,
+        latency=0.0,
+        tokens_per_second=0,
+        chars_per_token=4,
+        rate_limit_every=0,
+        retry_after=0,
+        host="127.0.0.1",
+        port=0,
+    ):
+        # responses: list of canned strings (cycled) or callable(request_body) -> str
+        responses = responses or [DEFAULT_RESPONSE]
+        self._responses = responses if callable(responses) else itertools.cycle(responses)
+        self.latency = latency  # Seconds before the first byte
+        self.tokens_per_second = tokens_per_second  # 0 sends the whole completion at once
+        self.chars_per_token = chars_per_token
+        self.rate_limit_every = rate_limit_every  # Every Nth request gets a 429
+        self.retry_after = retry_after
+        self.requests = []
+        self.completion_chars = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), MockHandler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def record(self, body):
+        with self._lock:
+            self.requests.append(body)
+            return len(self.requests)
+
+    def next_response(self, body):
+        content = self._responses(body) if callable(self._responses) else None
+        with self._lock:
+            if content is None:
+                content = next(self._responses)
+            self.completion_chars += len(content)
+        return content
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock OpenRouter chat completions endpoint")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Return 429 for every Nth request")
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--responses", help="JSONL file of canned responses ({\"content\": ...} per line)")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = [json.loads(line)["content"] for line in f if line.strip()]
+    mock = MockOpenRouter(
+        responses,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        port=args.port,
+    )
+    print(f"Mock OpenRouter listening on {mock.url} (set OPENROUTER_URL to this)")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
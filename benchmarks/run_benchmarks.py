@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from artifact_store import ArtifactStore  # noqa: E402
+from benchmarks.bench_parser import build_response  # noqa: E402
+from benchmarks.mock_openrouter import MockOpenRouter  # noqa: E402
+from response_parser import ResponseParser  # noqa: E402
+
+PROBLEM = "Create a small invoicing tool that can be sold for $19/month."
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def latency_stats(seconds):
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 3),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 3),
+        "max_ms": round(max(seconds) * 1000, 3),
+    }
+
+
+def peak_memory(fn, options, workdir):
+    """Peak traced Python allocation for one small pass of fn.
+
+    Measured separately so tracemalloc's overhead doesn't skew the timed runs.
+    """
+    small = argparse.Namespace(**{**vars(options), "iterations": 1, "conversations": 1})
+    tracemalloc.start()
+    try:
+        fn(small, workdir)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_parse(options, workdir):
+    response = build_response(int(options.parse_mb * 1e6))
+    timings = []
+    for _ in range(options.iterations):
+        parser = ResponseParser()
+        started = time.perf_counter()
+        for i in range(0, len(response), 256):
+            parser.feed(response[i : i + 256])
+        parser.close()
+        timings.append(time.perf_counter() - started)
+    result = latency_stats(timings)
+    result["throughput_mb_per_s"] = round(len(response) / percentile(timings, 50) / 1e6, 2)
+    return result
+
+
+def bench_create_file(options, workdir):
+    content = "print('hello')\n" * 700  # ~10 KB, a typical generated script
+    timings = []
+    for i in range(options.iterations * 20):
+        started = time.perf_counter()
+        app.create_file_with_content(f"tool_{i % 5}.py", content + f"# revision {i}\n", workdir)
+        timings.append(time.perf_counter() - started)
+    result = latency_stats(timings)
+    result["throughput_per_s"] = round(len(timings) / sum(timings), 1)
+    return result
+
+
+def bench_execute_command(options, workdir):
+    timings = []
+    for _ in range(options.iterations * 4):
+        started = time.perf_counter()
+        app.execute_command("echo hello", output_dir=workdir)
+        timings.append(time.perf_counter() - started)
+    result = latency_stats(timings)
+    block = "\n".join(f"python -c 'print({i})'" for i in range(8))
+    started = time.perf_counter()
+    app.execute_command(block, output_dir=workdir)
+    result["eight_command_block_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def bench_conversation(options, workdir, pipelined=False, rate_limit_every=0):
+    mock = MockOpenRouter(
+        latency=options.latency,
+        tokens_per_second=options.tokens_per_second,
+        rate_limit_every=rate_limit_every,
+    )
+    client = app.openrouter_client
+    saved = (client.url, client.api_key, client.cache, client.replay, app.get_openrouter_response)
+    call_starts = []  # Per conversation
+    call_timings = []
+
+    def timed_response(prompt, **kwargs):
+        started = time.perf_counter()
+        call_starts[-1].append(started)
+        try:
+            return saved[4](prompt, **kwargs)
+        finally:
+            call_timings.append(time.perf_counter() - started)
+
+    client.url, client.api_key, client.cache, client.replay = mock.url, "benchmark", None, None
+    app.get_openrouter_response = timed_response
+    products = []
+    try:
+        with mock:
+            for i in range(options.conversations):
+                session_dir = os.path.join(workdir, f"session_{i}")
+                os.makedirs(session_dir)
+                call_starts.append([])
+                started = time.perf_counter()
+                app.ai_conversation(PROBLEM, output_dir=session_dir, stream_output=False, pipelined=pipelined)
+                products.append(time.perf_counter() - started)
+    finally:
+        client.url, client.api_key, client.cache, client.replay, app.get_openrouter_response = saved
+
+    # A turn spans from one request being issued to the next, so it includes side effects and delays
+    turns = [b - a for starts in call_starts for a, b in zip(starts, starts[1:])]
+    return {
+        "turn_latency": latency_stats(turns),
+        "llm_latency": latency_stats(call_timings),
+        "product_seconds": latency_stats(products),
+        "requests": len(mock.requests),
+        "llm_calls_per_s": round(len(call_timings) / sum(products), 3),
+        "completion_tokens_per_s": round(mock.completion_chars / 4 / sum(products), 1),
+    }
+
+
+SCENARIOS = {
+    "parse_response": bench_parse,
+    "create_file_with_content": bench_create_file,
+    "execute_command": bench_execute_command,
+    "conversation_serial": lambda o, w: bench_conversation(o, w),
+    "conversation_pipelined": lambda o, w: bench_conversation(o, w, pipelined=True),
+    "conversation_rate_limited": lambda o, w: bench_conversation(o, w, pipelined=True, rate_limit_every=3),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(options):
+    names = options.scenarios or list(SCENARIOS)
+    # Work under OUTPUT_DIR so the command whitelist's directory checks apply as in real runs
+    workdir = tempfile.mkdtemp(prefix="bench-", dir=app.OUTPUT_DIR)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": {k: v for k, v in vars(options).items() if k not in ("output", "compare")},
+        "scenarios": {},
+    }
+    saved_store = app.artifact_store
+    app.artifact_store = ArtifactStore(os.path.join(workdir, ".artifacts"))
+    try:
+        # Keep the tools' own progress prints out of the JSON report
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in names:
+                scenario_dir = os.path.join(workdir, name)
+                os.makedirs(os.path.join(scenario_dir, "memory"))
+                result = SCENARIOS[name](options, scenario_dir)
+                result["peak_memory_bytes"] = peak_memory(
+                    SCENARIOS[name], options, os.path.join(scenario_dir, "memory")
+                )
+                report["scenarios"][name] = result
+    finally:
+        app.artifact_store = saved_store
+        shutil.rmtree(workdir, ignore_errors=True)
+    report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def compare(report, baseline):
+    """Ratios of current to baseline p50/p95 for every latency metric both reports share"""
+    ratios = {}
+    for name, metrics in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        flat = {name: metrics} if "p50_ms" in metrics else metrics
+        flat_old = {name: old} if "p50_ms" in old else old
+        for metric, stats in flat.items():
+            if isinstance(stats, dict) and isinstance(flat_old.get(metric), dict):
+                for key in ("p50_ms", "p95_ms"):
+                    if flat_old[metric].get(key):
+                        ratios[f"{name}.{metric}.{key}"] = round(stats[key] / flat_old[metric][key], 3)
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for The Twins against a mock OpenRouter")
+    parser.add_argument("scenarios", nargs="*", help=f"Any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--conversations", type=int, default=2)
+    parser.add_argument("--parse-mb", type=float, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock seconds before first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to compute p50/p95 ratios against")
+    options = parser.parse_args()
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = run(options)
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
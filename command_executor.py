@@ -0,0 +1,410 @@
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+CommandResult = namedtuple(
+    "CommandResult", ["command", "exit_code", "duration", "stdout", "stderr", "timed_out", "error"]
+)
+Heredoc = namedtuple("Heredoc", ["delimiter", "strip_tabs", "expands"])
+
+SEPARATORS = ("&&", "||", ";", "|", "&")
+# Commands that only read the file tree; consecutive runs of them may share a parallel batch
+READ_ONLY_COMMANDS = ("ls", "cat", "grep", "find", "tree", "echo", "flake8", "mypy")
+# find options that run commands or write files
+FIND_ACTIONS = ("-exec", "-execdir", "-ok", "-okdir", "-delete", "-fprint", "-fprint0", "-fprintf", "-fls")
+# `<<EOF`, `<<-EOF`, `<< 'EOF'`, `<<"EOF"` or `<<\EOF`; a quoted delimiter turns off expansion in the body
+HEREDOC = re.compile(r"<<(-?)[ \t]*(['\"]?)(\\?)([^\s;&|<>()'\"\\]+)\2")
+
+
+class OutputBuffer:
+    """Byte sink that keeps only the first and last `limit // 2` bytes of a stream"""
+
+    def __init__(self, limit):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = deque()
+        self.tail_size = 0
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self.tail.append(data)
+        self.tail_size += len(data)
+        while self.tail and self.tail_size - len(self.tail[0]) >= self.tail_limit:
+            self.tail_size -= len(self.tail.popleft())
+
+    def text(self):
+        tail = b"".join(self.tail)[-self.tail_limit:] if self.tail_limit else b""
+        omitted = self.total - len(self.head) - len(tail)
+        head = self.head.decode("utf-8", errors="replace")
+        if omitted <= 0:
+            return head + tail.decode("utf-8", errors="replace")
+        return f"{head}\n[... {omitted} bytes omitted ...]\n{tail.decode('utf-8', errors='replace')}"
+
+
+def scan_line(line, quote=None):
+    """Scan one line of shell that starts inside `quote` (None if it starts unquoted).
+
+    Returns the line without its comment, the quote still open at its end, the heredocs
+    it opens and whether it ends in a '\\' continuation.
+    """
+    heredocs = []
+    escaped = False
+    index = 0
+    while index < len(line):
+        char = line[index]
+        if escaped:
+            escaped = False
+        elif quote == "'":
+            if char == "'":
+                quote = None
+        elif char == "\\":
+            escaped = True
+        elif quote:
+            if char == '"':
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "#" and (index == 0 or line[index - 1] in " \t;&|()"):
+            return line[:index], quote, heredocs, False
+        elif line.startswith("<<<", index):
+            index += 3
+            continue
+        elif line.startswith("<<", index):
+            match = HEREDOC.match(line, index)
+            if match:
+                heredocs.append(Heredoc(match.group(4), match.group(1) == "-", not (match.group(2) or match.group(3))))
+                index = match.end()
+                continue
+        index += 1
+    return line, quote, heredocs, escaped
+
+
+def ends_heredoc(line, heredoc):
+    return (line.lstrip("\t") if heredoc.strip_tabs else line) == heredoc.delimiter
+
+
+def split_commands(block):
+    """Split a bash block into commands: one per line, honoring '\\' continuations and skipping comments.
+
+    A heredoc or a quoted string spanning several lines stays in one command. A block
+    that ends inside either cannot be split safely, so it is returned whole.
+    """
+    commands = []
+    current = ""
+    quote = None
+    heredocs = []  # Opened by the current command; their bodies follow its last line
+    in_body = False
+    for line in block.splitlines():
+        if in_body:
+            current += "\n" + line
+            if ends_heredoc(line, heredocs[0]):
+                heredocs.pop(0)
+                if not heredocs:
+                    commands.append(current)
+                    current = ""
+                    in_body = False
+            continue
+        if quote is None:
+            line = line.strip()
+            if not current and (not line or line.startswith("#")):
+                continue
+        _, quote, opened, continued = scan_line(line, quote)
+        heredocs.extend(opened)
+        if quote is not None:
+            current += line + "\n"
+        elif continued:
+            current += line[:-1].rstrip() + " "
+        elif heredocs:
+            current += line
+            in_body = True
+        else:
+            commands.append((current + line).strip())
+            current = ""
+    if quote is not None or heredocs:
+        return [block.strip()]
+    if current.strip():
+        commands.append(current.strip())
+    return commands
+
+
+def split_heredocs(command):
+    """Split command into its logical shell lines and its heredoc bodies, as (body, expands) pairs.
+
+    Comments are dropped from the lines and '\\' continuations joined, so each line
+    can be tokenized on its own.
+    """
+    lines = []
+    bodies = []
+    current = ""
+    quote = None
+    heredocs = []
+    body = None
+    for line in command.split("\n"):
+        if body is not None:
+            if ends_heredoc(line, heredocs[0]):
+                bodies.append(("\n".join(body), heredocs.pop(0).expands))
+                body = [] if heredocs else None
+            else:
+                body.append(line)
+            continue
+        code, quote, opened, continued = scan_line(line, quote)
+        heredocs.extend(opened)
+        if quote is not None:
+            current += code + "\n"
+        elif continued:
+            current += code[:-1] + " "
+        else:
+            lines.append(current + code)
+            current = ""
+            if heredocs:
+                body = []
+    if current:
+        lines.append(current)
+    if body is not None:
+        # bash reads an unterminated heredoc to the end of the command
+        bodies.append(("\n".join(body), any(heredoc.expands for heredoc in heredocs)))
+    return lines, bodies
+
+
+def find_expansion(command):
+    """The first unquoted '$' or backtick in command, or None; single quotes keep them literal"""
+    quote = None
+    escaped = False
+    for char in command:
+        if escaped:
+            escaped = False
+        elif quote == "'":
+            if char == "'":
+                quote = None
+        elif char == "\\":
+            escaped = True
+        elif char in "$`":
+            return char
+        elif char == '"':
+            quote = None if quote else char
+        elif char == "'" and not quote:
+            quote = char
+    return None
+
+
+def kill_process_group(process):
+    """Terminate a process started with start_new_session and its whole group, escalating to SIGKILL"""
+    if not hasattr(os, "killpg"):
+        process.kill()
+        process.wait()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=2)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        pass
+    try:
+        # Also reaps group members that outlived or ignored SIGTERM
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def is_within(path, directories):
+    return any(
+        os.path.commonpath([path, os.path.realpath(d)]) == os.path.realpath(d) for d in directories
+    )
+
+
+class CommandExecutor:
+    """Run whitelisted shell commands with timeouts, bounded output and limited parallelism"""
+
+    def __init__(self, allowed_commands, allowed_dirs, timeout=120, max_output=16 * 1024, max_parallel=4):
+        self.allowed_commands = allowed_commands
+        self.allowed_dirs = allowed_dirs
+        self.timeout = timeout
+        self.max_output = max_output
+        self.max_parallel = max_parallel
+
+    def tokenize(self, command):
+        """Parse command once into argv segments split at shell operators and line ends; heredoc bodies are skipped"""
+        segments = [[]]
+        for line in split_heredocs(command)[0]:
+            lexer = shlex.shlex(line, posix=True, punctuation_chars=True)
+            lexer.whitespace_split = True
+            lexer.commenters = ""  # Comments are already gone; a '#' inside a word is literal
+            for token in lexer:
+                if token in SEPARATORS:
+                    segments.append([])
+                else:
+                    segments[-1].append(token)
+            segments.append([])
+        return [segment for segment in segments if segment]
+
+    def validate(self, command, cwd):
+        """Return an error message if command is not allowed, else None"""
+        lines, bodies = split_heredocs(command)
+        shell_text = "\n".join(lines)
+        # Quotes are literal in a heredoc body, so any '$' or backtick in one that expands counts
+        expanding = "".join(body for body, expands in bodies if expands)
+        expansion = find_expansion(shell_text) or next((char for char in "`$" if char in expanding), None)
+        if expansion == "`" or "$(" in shell_text or "$(" in expanding:
+            return "Error: Command substitution is not allowed."
+        if expansion:
+            # Expanded paths would slip past the directory checks below
+            return "Error: Shell variable expansion is not allowed."
+        try:
+            segments = self.tokenize(command)
+        except ValueError as e:
+            return f"Error: Could not parse command: {e}"
+        if not segments:
+            return "Error: No command provided."
+
+        restricted_paths = []
+        for argv in segments:
+            if argv[0] not in self.allowed_commands:
+                return f"Error: Command '{argv[0]}' not in whitelist: {self.allowed_commands}"
+            # Restrict to allowed directories (but allow creating new files/folders)
+            for arg in argv[1:]:
+                if arg.startswith("-") or not arg.strip("<>&|()"):
+                    continue
+                path = os.path.realpath(os.path.join(cwd, os.path.expanduser(arg)))
+                looks_like_path = os.sep in arg or arg.startswith(("~", ".."))
+                if (looks_like_path or os.path.exists(path)) and not is_within(path, self.allowed_dirs):
+                    restricted_paths.append(arg)
+        if restricted_paths:
+            return f"Error: Access restricted to {self.allowed_dirs}. Attempted to access: {restricted_paths}"
+        return None
+
+    def run(self, command, cwd):
+        """Run one command in its own process group and return a CommandResult"""
+        error = self.validate(command, cwd)
+        if error:
+            return CommandResult(command, None, 0.0, "", "", False, error)
+
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+            )
+        except Exception as e:
+            return CommandResult(command, None, 0.0, "", "", False, f"Error executing command: {str(e)}")
+
+        stdout = OutputBuffer(self.max_output)
+        stderr = OutputBuffer(self.max_output)
+        readers = [
+            threading.Thread(target=self._drain, args=(process.stdout, stdout), daemon=True),
+            threading.Thread(target=self._drain, args=(process.stderr, stderr), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        timed_out = False
+        try:
+            process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            self._kill(process)
+        for reader in readers:
+            reader.join(timeout=1)
+        if any(reader.is_alive() for reader in readers):
+            # Background children left in the group still hold the pipes open
+            self._kill(process)
+            for reader in readers:
+                reader.join(timeout=1)
+
+        return CommandResult(
+            command,
+            process.returncode,
+            time.monotonic() - started,
+            stdout.text(),
+            stderr.text(),
+            timed_out,
+            None,
+        )
+
+    @staticmethod
+    def _drain(pipe, buffer):
+        with pipe:
+            for chunk in iter(lambda: pipe.read1(65536), b""):
+                buffer.write(chunk)
+
+    @staticmethod
+    def _kill(process):
+        kill_process_group(process)
+
+    def is_read_only(self, command):
+        """Whether command only reads files, so it cannot affect commands run alongside it"""
+        try:
+            segments = self.tokenize(command)
+        except ValueError:
+            return False
+        for argv in segments:
+            if argv[0] == "black":
+                if "--check" not in argv:
+                    return False
+            elif argv[0] not in READ_ONLY_COMMANDS:
+                return False
+            if any(token.startswith((">", "<")) for token in argv):
+                return False
+            if argv[0] == "find" and any(token in FIND_ACTIONS for token in argv):
+                return False
+        return True
+
+    def run_all(self, commands, cwd):
+        """Run commands in order; only consecutive read-only commands run in parallel. Results keep input order"""
+        results = [None] * len(commands)
+        batch = []
+
+        def flush():
+            if len(batch) == 1:
+                index = batch[0]
+                results[index] = self.run(commands[index], cwd)
+            elif batch:
+                with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+                    futures = {index: pool.submit(self.run, commands[index], cwd) for index in batch}
+                    for index, future in futures.items():
+                        results[index] = future.result()
+            batch.clear()
+
+        for index, command in enumerate(commands):
+            if self.is_read_only(command):
+                batch.append(index)
+            else:
+                flush()
+                batch.append(index)
+                flush()
+        flush()
+        return results
+
+
+def format_result(result, timeout=None):
+    """Transcript text for a CommandResult, in the style execute_command has always returned.
+
+    A timeout is reported with the configured limit rather than the measured duration,
+    so the text is the same on every run.
+    """
+    if result.error:
+        return result.error
+    if result.timed_out:
+        limit = f" after {timeout:g}s" if timeout is not None else ""
+        return f"Error: Command timed out{limit}\n{result.stdout}{result.stderr}"
+    if result.exit_code == 0:
+        return result.stdout
+    return f"Error: {result.stderr or result.stdout} (exit code {result.exit_code})"
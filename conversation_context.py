@@ -0,0 +1,139 @@
+import re
+from collections import deque
+
+CHARS_PER_TOKEN = 4  # Rough average for English prose and code; avoids a tokenizer dependency
+MAX_LISTED_FILES = 50
+MESSAGE_OVERHEAD = 8  # Tokens for speaker/result labels and message framing
+CODE_BLOCK_RE = re.compile(r"```[^\n`]*\n?.*?(```|$)", re.DOTALL)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_middle(text, max_tokens):
+    """Keep the head and tail of text within max_tokens, eliding the middle"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    half = max(max_chars // 2 - 40, 0)
+    omitted = len(text) - 2 * half
+    return f"{text[:half]}\n[... {omitted} characters omitted ...]\n{text[-half:]}"
+
+
+def summarize_entry(entry, max_chars=240):
+    """One-line extractive summary of a transcript entry"""
+    if entry["kind"] == "message":
+        prose = CODE_BLOCK_RE.sub("[code]", entry["content"])
+        text = " ".join(prose.split())
+        label = entry["speaker"]
+    else:
+        lines = entry["content"].strip().splitlines() or [""]
+        text = lines[0] if len(lines) == 1 else f"{lines[0]} ... ({len(lines)} lines)"
+        label = entry["kind"]
+    if len(text) > max_chars:
+        text = text[: max_chars - 3] + "..."
+    return f"{label}: {text}"
+
+
+class ConversationContext:
+    """Build a token-budgeted messages array from the twins' transcript.
+
+    The most recent entries are sent verbatim. Older entries are folded, once each,
+    into a bounded running summary, so prompt size stays flat over long sessions.
+    """
+
+    def __init__(self, problem, token_budget=6000, summary_budget=1000, min_recent=2, summarizer=None):
+        self.problem = problem
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_recent = min_recent
+        # Optional callable(previous_summary, entries) -> new summary, e.g. backed by an LLM
+        self.summarizer = summarizer
+        self.entries = deque()  # Entries not yet folded into the summary
+        self.summary_lines = deque()
+        self.summary_text = ""
+        self.omitted = 0  # Summary lines dropped to respect summary_budget
+        self.files = []  # Every file ever created stays listed in the summary
+
+    def add_message(self, speaker, content):
+        self._add({"kind": "message", "speaker": speaker, "content": content})
+
+    def add_result(self, kind, content):
+        """Record a tool result, e.g. kind "File Creation Result" or "Command Result" """
+        self._add({"kind": kind, "speaker": None, "content": content})
+
+    def add_file(self, filename):
+        if filename not in self.files:
+            self.files.append(filename)
+
+    def _add(self, entry):
+        entry["tokens"] = estimate_tokens(entry["content"]) + MESSAGE_OVERHEAD
+        self.entries.append(entry)
+
+    def _fold(self, entries):
+        if self.summarizer:
+            summary = self.summarizer(self.summary_text, entries)
+            self.summary_text = truncate_middle(summary, self.summary_budget)
+            return
+        for entry in entries:
+            line = summarize_entry(entry)
+            self.summary_lines.append((line, estimate_tokens(line)))
+        total = sum(tokens for _, tokens in self.summary_lines)
+        while self.summary_lines and total > self.summary_budget:
+            _, tokens = self.summary_lines.popleft()
+            total -= tokens
+            self.omitted += 1
+        self.summary_text = "\n".join(line for line, _ in self.summary_lines)
+
+    def system_message(self):
+        parts = [f"Problem to solve: {self.problem}"]
+        if self.files:
+            listed = ", ".join(self.files[-MAX_LISTED_FILES:])
+            if len(self.files) > MAX_LISTED_FILES:
+                listed = f"{len(self.files) - MAX_LISTED_FILES} earlier files, {listed}"
+            parts.append(f"Files created so far: {listed}")
+        if self.summary_text:
+            header = "Summary of earlier conversation"
+            if self.omitted:
+                header += f" ({self.omitted} older events omitted)"
+            parts.append(f"{header}:\n{self.summary_text}")
+        return "\n\n".join(parts)
+
+    def _as_message(self, entry, speaker):
+        if entry["kind"] != "message":
+            return {"role": "user", "content": f"{entry['kind']}: {entry['content']}"}
+        if entry["speaker"] == speaker:
+            return {"role": "assistant", "content": entry["content"]}
+        return {"role": "user", "content": f"{entry['speaker']}: {entry['content']}"}
+
+    def build_messages(self, speaker, instruction):
+        """Messages for speaker's next request, ending with the turn instruction"""
+        fixed = estimate_tokens(instruction) + self.summary_budget + estimate_tokens(self.problem)
+        fixed += sum(estimate_tokens(f) + 1 for f in self.files[-MAX_LISTED_FILES:])
+        fixed += 4 * MESSAGE_OVERHEAD  # System message section headers
+        available = max(self.token_budget - fixed, 0)
+
+        # Walk back from the newest entry until the verbatim window is full
+        keep = 0
+        used = 0
+        for entry in reversed(self.entries):
+            if used + entry["tokens"] > available and keep >= self.min_recent:
+                break
+            used += entry["tokens"]
+            keep += 1
+
+        stale = len(self.entries) - keep
+        if stale:
+            self._fold([self.entries.popleft() for _ in range(stale)])
+
+        messages = [{"role": "system", "content": self.system_message()}]
+        per_entry = max(available // max(keep, 1) - MESSAGE_OVERHEAD, 1)
+        for entry in self.entries:
+            message = self._as_message(entry, speaker)
+            if used > available:
+                # Only the min_recent entries can overflow; squeeze them to fit
+                message["content"] = truncate_middle(message["content"], per_entry)
+            messages.append(message)
+        messages.append({"role": "user", "content": instruction})
+        return messages
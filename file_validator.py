@@ -0,0 +1,175 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from command_executor import kill_process_group
+
+CheckResult = namedtuple("CheckResult", ["check", "passed", "output"])
+
+# Linters the model may also run itself; each is used only if whitelisted and installed
+LINTERS = {
+    "flake8": ["flake8", "--max-line-length=120"],
+    "mypy": ["mypy", "--ignore-missing-imports", "--no-error-summary", "--no-incremental"],
+    "black": ["black", "--check", "--quiet"],
+}
+# Load the file as a module (not __main__) so only import-time code runs
+IMPORT_SNIPPET = (
+    "import importlib.util, sys; "
+    "spec = importlib.util.spec_from_file_location('smoke_test', sys.argv[1]); "
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+)
+MAX_OUTPUT_LINES = 3
+MAX_OUTPUT_CHARS = 300
+
+
+def shorten(output, path):
+    """First few lines of a check's output, with the file's path reduced to its name"""
+    output = output.replace(path + ":", "line ").replace(path, os.path.basename(path))
+    lines = [line for line in output.strip().splitlines() if line.strip()]
+    text = "; ".join(lines[:MAX_OUTPUT_LINES])
+    if len(lines) > MAX_OUTPUT_LINES:
+        text += f" (+{len(lines) - MAX_OUTPUT_LINES} more)"
+    if len(text) > MAX_OUTPUT_CHARS:
+        text = text[: MAX_OUTPUT_CHARS - 3] + "..."
+    return text
+
+
+def run_tool(name, args, cwd, timeout):
+    """Run a check in its own process group with no stdin, killing the group on timeout"""
+    try:
+        process = subprocess.Popen(
+            args,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return CheckResult(name, False, str(e))
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(process)
+        process.communicate()
+        return CheckResult(name, False, f"timed out after {timeout:g}s")
+    return CheckResult(name, process.returncode == 0, stdout + stderr)
+
+
+def run_checks(path, source, checks, linters, timeout):
+    """Run checks on one file; later checks are skipped if it does not even compile.
+
+    Tools see a private copy of source, so a rewrite of path while they run cannot
+    leak into this result. They still run from path's directory to find its neighbours.
+    """
+    try:
+        compile(source, path, "exec")
+    except (SyntaxError, ValueError) as e:
+        where = f"line {e.lineno}: " if getattr(e, "lineno", None) else ""
+        return [CheckResult("syntax", False, f"{where}{getattr(e, 'msg', e)}")]
+    results = [CheckResult("syntax", True, "")]
+    cwd = os.path.dirname(path)
+    with tempfile.TemporaryDirectory(prefix="twins-check-") as snapshot_dir:
+        snapshot = os.path.join(snapshot_dir, os.path.basename(path))
+        with open(snapshot, "w", encoding="utf-8") as f:
+            f.write(source)
+        if "import" in checks:
+            result = run_tool("import", [sys.executable, "-c", IMPORT_SNIPPET, snapshot], cwd, timeout)
+            if not result.passed:
+                # The exception line at the end of the traceback says what went wrong
+                lines = result.output.strip().splitlines()
+                result = result._replace(output=lines[-1] if lines else "failed")
+            results.append(result)
+        for name in checks:
+            if name in linters:
+                result = run_tool(name, linters[name] + [snapshot], cwd, timeout)
+                if name == "black" and not result.passed and not result.output.strip():
+                    result = result._replace(output="would reformat")
+                results.append(result)
+    return [r._replace(output=shorten(r.output, snapshot)) for r in results]
+
+
+def format_checks(results):
+    """One line if everything passed, otherwise one line per failing check"""
+    failed = [r for r in results if not r.passed]
+    passed = ", ".join(r.check for r in results if r.passed)
+    if not failed:
+        return f"Checks passed: {passed}"
+    lines = [f"Checks failed: {', '.join(r.check for r in failed)}" + (f" (passed: {passed})" if passed else "")]
+    lines.extend(f"  {r.check}: {r.output}" for r in failed)
+    return "\n".join(lines)
+
+
+class FileValidator:
+    """Check generated Python files in the background, caching summaries by content hash.
+
+    Each check runs in its own subprocess, so a small thread pool is enough to check
+    many files in parallel. A file whose name and content were already checked is
+    never checked again. Import results assume the file's neighbours are unchanged.
+    """
+
+    def __init__(self, allowed_commands, checks=None, linters=None, timeout=20, max_workers=4, max_entries=10000):
+        linters = LINTERS if linters is None else linters
+        available = ["syntax", "import"] + [
+            name for name, args in linters.items() if name in allowed_commands and shutil.which(args[0])
+        ]
+        self.checks = tuple(name for name in available if checks is None or name in checks)
+        self.linters = {name: args for name, args in linters.items() if name in self.checks}
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-check")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # key -> summary text
+        self._in_flight = {}  # key -> Future, so identical concurrent writes share one run
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, path, source):
+        digest = hashlib.sha256(f"{','.join(self.checks)}\0{os.path.basename(path)}\0".encode())
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def submit(self, path, source):
+        """Future for the summary of checks on path, whose content is source"""
+        key = self._key(path, source)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if key in self._in_flight:
+                self.hits += 1
+                return self._in_flight[key]
+            self.misses += 1
+            future = self._pool.submit(self._check, key, path, source)
+            self._in_flight[key] = future
+            return future
+
+    def _check(self, key, path, source):
+        summary = None
+        try:
+            summary = format_checks(run_checks(path, source, self.checks, self.linters, self.timeout))
+            return summary
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if summary is not None:
+                    self._cache[key] = summary
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache), "checks": list(self.checks)}
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,223 @@
+import email.utils
+import json
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from response_cache import cache_key
+
+DEFAULT_MODEL = "tngtech/deepseek-r1t2-chimera:free"
+RETRY_STATUSES = (429, 502, 503)
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CompletionStream:
+    """Iterate over the tokens of a streamed chat completion as they arrive"""
+
+    def __init__(self, response, started, on_complete=None):
+        self.response = response
+        self.started = started
+        self.on_complete = on_complete
+        self.ttft = None  # Seconds from request start to the first content token
+        self.duration = None
+        self.usage = None
+        self.cached = False
+        self._parts = []
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def __iter__(self):
+        done = False
+        try:
+            # Read to the end of the body even after [DONE], so the connection goes back to the pool
+            for line in self.response.iter_lines():
+                # SSE comments (": OPENROUTER PROCESSING") and blank keep-alives carry no data
+                if done or not line or not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    done = True
+                    continue
+                chunk = json.loads(payload)
+                if "error" in chunk:
+                    message = chunk["error"].get("message", chunk["error"])
+                    raise ValueError(f"OpenRouter returned an error mid-stream: {message}")
+                if chunk.get("usage"):
+                    self.usage = chunk["usage"]
+                choices = chunk.get("choices") or [{}]
+                token = (choices[0].get("delta") or {}).get("content")
+                if not token:
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.started
+                self._parts.append(token)
+                yield token
+            # A body that ends without [DONE] was cut short; never cache or record it
+            if done and self.on_complete:
+                self.on_complete(self.text, self.usage)
+        except requests.exceptions.RequestException as e:
+            raise ValueError(f"The stream from OpenRouter was interrupted: {e}")
+        finally:
+            self.duration = time.monotonic() - self.started
+            self.response.close()
+
+    def read(self):
+        """Consume the remaining stream and return the full completion text"""
+        for _ in self:
+            pass
+        return self.text
+
+
+class StoredStream:
+    """Stand-in for CompletionStream that serves a cached or recorded completion"""
+
+    def __init__(self, content):
+        self.ttft = 0.0
+        self.duration = 0.0
+        self.usage = None
+        self.cached = True
+        self.text = content
+
+    def __iter__(self):
+        if self.text:
+            yield self.text
+
+    def read(self):
+        return self.text
+
+
+class OpenRouterClient:
+    """Chat completions client that reuses pooled keep-alive connections"""
+
+    def __init__(
+        self,
+        api_key,
+        url,
+        connect_timeout=10,
+        read_timeout=60,
+        pool_size=10,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+        cache=None,
+        replay=None,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache  # ResponseCache consulted before the network
+        self.replay = replay  # ReplayLog to record to or strictly replay from
+        # With streaming the read timeout bounds the gap between chunks, not the whole completion
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.set_pool_size(pool_size)
+
+    def set_pool_size(self, pool_size):
+        """Size the keep-alive pool so concurrent sessions don't open throwaway connections"""
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _post(self, data, stream):
+        if not self.api_key or self.api_key.strip() == "":
+            raise ValueError("OpenRouter API key is missing. Please set the OPENROUTER_API_KEY environment variable.")
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    self.url, headers=headers, json=data, timeout=self.timeout, stream=stream
+                )
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                    response.close()
+                    print(f"OpenRouter returned {response.status_code}, retrying in {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+            except requests.exceptions.Timeout:
+                raise ValueError("The request to OpenRouter timed out. Please try again later.")
+            except requests.exceptions.RequestException as e:
+                raise ValueError(f"An error occurred while communicating with OpenRouter: {e}")
+            return response
+
+    def _backoff(self, attempt, retry_after):
+        """Delay before the next attempt: honor Retry-After, else exponential backoff with full jitter"""
+        delay = retry_after_seconds(retry_after)
+        if delay is not None:
+            # Small jitter so sessions released by the same Retry-After don't stampede together
+            return min(delay, self.backoff_max) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _lookup(self, key, model, messages, params):
+        """Return a stored completion for key, or None when the network must be used"""
+        if self.replay:
+            content = self.replay.get(key)
+            if content is not None:
+                return content
+        if self.cache:
+            content = self.cache.get(key)
+            if content is not None and self.replay:
+                # A recording must hold every completion the run used, cache hits included
+                self.replay.record(key, model, messages, params, content)
+            return content
+        return None
+
+    def _store(self, key, model, messages, params, content, usage=None):
+        if self.cache:
+            self.cache.put(key, content, usage)
+        if self.replay:
+            self.replay.record(key, model, messages, params, content)
+
+    def stream(self, messages, model=DEFAULT_MODEL, **params):
+        """Start a streamed completion and return a CompletionStream over its tokens"""
+        key = cache_key(model, messages, params)
+        content = self._lookup(key, model, messages, params)
+        if content is not None:
+            return StoredStream(content)
+        # Ask OpenRouter to report token usage in the final chunk
+        data = {"model": model, "messages": messages, "stream": True, "usage": {"include": True}, **params}
+        started = time.monotonic()
+
+        def on_complete(text, usage):
+            self._store(key, model, messages, params, text, usage)
+
+        return CompletionStream(self._post(data, stream=True), started, on_complete)
+
+    def complete(self, messages, model=DEFAULT_MODEL, **params):
+        """Request a completion in one response and return its text"""
+        key = cache_key(model, messages, params)
+        content = self._lookup(key, model, messages, params)
+        if content is not None:
+            return content
+        data = {"model": model, "messages": messages, **params}
+        response = self._post(data, stream=False)
+        body = response.json()
+        content = body["choices"][0]["message"]["content"]
+        self._store(key, model, messages, params, content, body.get("usage"))
+        return content
+
+    def close(self):
+        self.session.close()
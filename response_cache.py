@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(model, messages, params=None):
+    """Content address for a completion request: hash of model, messages and sampling params"""
+    request = {"model": model, "messages": messages, "params": params or {}}
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk completion cache with LRU eviction by entry count, total size and age"""
+
+    def __init__(self, directory, max_entries=1000, max_bytes=100 * 1024 * 1024, max_age=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age  # Seconds; None keeps entries until they are evicted for space
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[: -len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _remove(self, key):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key):
+        """Return the cached completion text for key, or None on a miss"""
+        with self._lock:
+            path = self._path(key)
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                    self._remove(key)
+                    self.evictions += 1
+                    self.misses += 1
+                    return None
+                with open(path, encoding="utf-8") as f:
+                    record = json.load(f)
+                os.utime(path)  # mtime doubles as the LRU timestamp across runs
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return record["content"]
+
+    def put(self, key, content, usage=None):
+        record = json.dumps({"key": key, "content": content, "usage": usage}, ensure_ascii=False)
+        data = record.encode("utf-8")
+        with self._lock:
+            # Write to a temp file and rename so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._index and (
+            len(self._index) > self.max_entries
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._index))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+
+class ReplayLog:
+    """Record completions to a JSONL file, or serve them back from it without any network"""
+
+    def __init__(self, path, mode="replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode '{mode}', expected 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        key = record.get("key") or cache_key(
+                            record["model"], record["messages"], record.get("params")
+                        )
+                        self._records[key] = record["content"]
+
+    @property
+    def strict(self):
+        return self.mode == "replay"
+
+    def get(self, key):
+        """Return the recorded completion for key; in replay mode a missing one is an error"""
+        content = self._records.get(key)
+        if content is None and self.strict:
+            raise ValueError(f"No recorded completion for request {key[:12]} in {self.path}")
+        if content is not None:
+            self.replayed += 1
+        return content
+
+    def record(self, key, model, messages, params, content):
+        if self.mode != "record":
+            return
+        entry = {"key": key, "model": model, "messages": messages, "params": params, "content": content}
+        with self._lock:
+            self._records[key] = content
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
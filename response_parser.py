@@ -0,0 +1,118 @@
+import re
+from collections import namedtuple
+
+# Events emitted by ResponseParser, in the order they appear in the response
+FileBlock = namedtuple("FileBlock", ["filename", "language", "content"])
+CommandBlock = namedtuple("CommandBlock", ["command"])
+CompletionMarker = namedtuple("CompletionMarker", [])
+UnclosedBlock = namedtuple("UnclosedBlock", ["filename", "language"])
+
+COMMAND_LANGUAGES = ("bash", "sh", "shell", "console")
+COMPLETION_MARKER = "SOLUTION_COMPLETE"
+FILENAME_RE = re.compile(r"filename\s*:\s*(.*)", re.IGNORECASE)
+
+
+def extract_filename(line):
+    """Filename from lines like 'filename: a.py', '**filename: a.py**' or '# filename: `a.py`'"""
+    match = FILENAME_RE.search(line)
+    if not match:
+        return None
+    names = match.group(1).replace("*", "").replace("`", "").split()
+    return names[0] if names else None
+
+
+class ResponseParser:
+    """Single-pass tokenizer for model responses that can be fed streamed chunks.
+
+    feed() returns the events completed by that chunk: a FileBlock as soon as its
+    closing fence arrives, a CommandBlock per bash fence and one CompletionMarker.
+    """
+
+    def __init__(self):
+        self._carry = []  # Pieces of the current, not yet terminated line
+        self._fence = None  # Language of the open fence, or None outside code
+        self._fence_lines = []
+        self._fence_filename = None
+        self._pending_filename = None
+        self.completed = False
+
+    def feed(self, chunk):
+        if "\n" not in chunk:
+            # Buffer pieces instead of concatenating so one huge line stays linear
+            self._carry.append(chunk)
+            return []
+        lines = chunk.split("\n")
+        self._carry.append(lines[0])
+        lines[0] = "".join(self._carry)
+        self._carry = [lines.pop()]
+        events = []
+        for line in lines:
+            self._line(line, events)
+        return events
+
+    def close(self):
+        """Flush the final unterminated line and report a fence left open"""
+        events = []
+        last = "".join(self._carry)
+        self._carry = []
+        if last:
+            self._line(last, events)
+        if self._fence is not None:
+            events.append(UnclosedBlock(self._fence_filename, self._fence))
+            self._fence = None
+        return events
+
+    def _line(self, line, events):
+        line = line.rstrip("\r")
+        stripped = line.strip()
+        if self._fence is not None:
+            if stripped.startswith("```"):
+                self._close_fence(events)
+            else:
+                self._fence_lines.append(line)
+            return
+
+        if stripped.startswith("```"):
+            rest = stripped[3:]
+            inline = len(rest) >= 3 and rest.endswith("```")
+            if inline:
+                rest = rest[:-3]
+            language, _, body = rest.strip().partition(" ")
+            self._open_fence(language.lower(), body)
+            if inline:
+                self._close_fence(events)
+            return
+
+        filename = extract_filename(line)
+        if filename:
+            self._pending_filename = filename
+        if not self.completed and COMPLETION_MARKER in line:
+            self.completed = True
+            events.append(CompletionMarker())
+
+    def _open_fence(self, language, body):
+        self._fence = language
+        self._fence_lines = [body] if body else []
+        self._fence_filename = self._pending_filename
+        self._pending_filename = None
+
+    def _close_fence(self, events):
+        content = "\n".join(self._fence_lines).strip()
+        if self._fence in COMMAND_LANGUAGES:
+            if content:
+                events.append(CommandBlock(content))
+        else:
+            filename = self._fence_filename
+            if not filename and self._fence_lines:
+                # Also accept a '# filename: x.py' comment on the first code line
+                filename = extract_filename(self._fence_lines[0])
+            events.append(FileBlock(filename, self._fence, content))
+        self._fence = None
+        self._fence_lines = []
+        self._fence_filename = None
+
+
+def parse_response(text):
+    """Parse a complete response into its list of events"""
+    parser = ResponseParser()
+    return parser.feed(text) + parser.close()
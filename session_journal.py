@@ -0,0 +1,125 @@
+import glob
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from collections.abc import Sequence
+
+JOURNAL_DIR_NAME = ".journals"
+
+
+def read_records(path):
+    """Yield journal records in order, skipping a final line torn by a crash mid-write"""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield json.loads(line)
+
+
+def find_journal(session, output_root):
+    """Resolve a session id (or a journal path) to its journal file under output_root"""
+    if os.path.isfile(session):
+        return session
+    pattern = os.path.join(glob.escape(output_root), "**", JOURNAL_DIR_NAME, f"{glob.escape(session)}.jsonl")
+    matches = glob.glob(pattern, recursive=True)
+    if not matches:
+        raise ValueError(f"No journal found for session '{session}' under {output_root}")
+    return matches[0]
+
+
+class SessionJournal:
+    """Append-only JSONL log of one conversation: every prompt, response and side-effect result.
+
+    Records are flushed as they are written; records for finished LLM calls are also
+    fsynced, so a crash never loses a call that was paid for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.session_id = os.path.basename(path)[: -len(".jsonl")]
+        self._repair()
+        self._file = open(path, "ab")
+
+    @classmethod
+    def create(cls, directory):
+        os.makedirs(directory, exist_ok=True)
+        session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        return cls(os.path.join(directory, f"{session_id}.jsonl"))
+
+    def _repair(self):
+        # Drop a torn last line so the next record starts on a line of its own
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def records(self):
+        return read_records(self.path)
+
+    def start_record(self):
+        return next(self.records(), None)
+
+    def append(self, record, sync=False):
+        line = json.dumps({**record, "time": round(time.time(), 3)}) + "\n"
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Transcript(Sequence):
+    """Append-only list of transcript entries that keeps only the newest `keep` in memory.
+
+    Older entries are spilled to a temporary file and read back on access, so a long
+    session's transcript costs one file offset per entry in RAM.
+    """
+
+    def __init__(self, keep=200):
+        self.keep = keep
+        self._recent = deque()
+        self._offsets = []  # Spill file offset of each spilled entry
+        self._spill = None
+
+    def append(self, entry):
+        self._recent.append(entry)
+        if len(self._recent) > self.keep:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile()
+            self._spill.seek(0, os.SEEK_END)
+            self._offsets.append(self._spill.tell())
+            self._spill.write(json.dumps(self._recent.popleft()).encode("utf-8") + b"\n")
+
+    def __len__(self):
+        return len(self._offsets) + len(self._recent)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transcript index out of range")
+        if index >= len(self._offsets):
+            return self._recent[index - len(self._offsets)]
+        self._spill.seek(self._offsets[index])
+        return json.loads(self._spill.readline())
+
+    def __iter__(self):
+        if self._spill is not None:
+            self._spill.seek(0)
+            for _ in range(len(self._offsets)):
+                yield json.loads(self._spill.readline())
+        yield from list(self._recent)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
@@ -0,0 +1,107 @@
+import os
+import stat
+
+import app
+from artifact_store import UMASK, ArtifactStore, session_name
+
+
+def blob_count(store):
+    return sum(len(files) for _, _, files in os.walk(store.blob_dir))
+
+
+def test_identical_content_is_a_no_op(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    workdir = tmp_path / "work"
+
+    assert store.save("s", str(workdir), "tool.py", "print(1)\n") == (1, True)
+    mtime = os.stat(workdir / "tool.py").st_mtime_ns
+    assert store.save("s", str(workdir), "tool.py", "print(1)\n") == (1, False)
+    assert os.stat(workdir / "tool.py").st_mtime_ns == mtime
+    assert len(store.history("s", "tool.py")) == 1
+
+
+def test_blobs_are_shared_across_files_and_sessions(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    store.save("a", str(tmp_path / "a"), "one.py", "same\n")
+    store.save("a", str(tmp_path / "a"), "two.py", "same\n")
+    store.save("b", str(tmp_path / "b"), "one.py", "same\n")
+
+    assert blob_count(store) == 1
+    assert store.sessions() == ["a", "b"]
+
+
+def test_versions_can_be_listed_and_restored(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    workdir = str(tmp_path / "work")
+    store.save("s", workdir, "tool.py", "v1\n")
+    store.save("s", workdir, "tool.py", "v2\n")
+
+    assert [v["version"] for v in store.history("s", "tool.py")] == [1, 2]
+    assert store.read("s", "tool.py", 1) == "v1\n"
+    assert store.restore("s", workdir, "tool.py", 1) == 3
+    assert (tmp_path / "work" / "tool.py").read_text() == "v1\n"
+    assert store.history("s", "tool.py")[-1]["restored_from"] == 1
+
+    # A fresh store reads the same history back from the manifest
+    assert ArtifactStore(str(tmp_path / "store")).read("s", "tool.py") == "v1\n"
+
+
+def test_external_edits_are_kept_as_versions(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    workdir = tmp_path / "work"
+    store.save("s", str(workdir), "tool.py", "generated\n")
+    (workdir / "tool.py").write_text("edited by a command\n")
+    store.save("s", str(workdir), "tool.py", "regenerated\n")
+
+    versions = store.history("s", "tool.py")
+    assert [v.get("external", False) for v in versions] == [False, True, False]
+    assert store.read("s", "tool.py", 2) == "edited by a command\n"
+
+
+def test_writes_leave_no_temp_files(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    workdir = tmp_path / "work"
+    for i in range(5):
+        store.save("s", str(workdir), "tool.py", f"revision {i}\n")
+
+    leftovers = [name for _, _, files in os.walk(tmp_path) for name in files if name.startswith(".tmp-")]
+    assert leftovers == []
+    assert os.listdir(workdir) == ["tool.py"]
+
+
+def test_working_files_keep_normal_permissions(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    workdir = str(tmp_path / "work")
+    tool = tmp_path / "work" / "tool.py"
+    store.save("s", workdir, "tool.py", "v1\n")
+    assert stat.S_IMODE(tool.stat().st_mode) == 0o666 & ~UMASK
+
+    os.chmod(tool, 0o755)
+    store.save("s", workdir, "tool.py", "v2\n")
+    assert stat.S_IMODE(tool.stat().st_mode) == 0o755
+    store.restore("s", workdir, "tool.py", 1)
+    assert stat.S_IMODE(tool.stat().st_mode) == 0o755
+
+
+def test_session_name_is_relative_to_output_root(tmp_path):
+    assert session_name(str(tmp_path), str(tmp_path)) == "default"
+    assert session_name(str(tmp_path / "sessions" / "run-1"), str(tmp_path)) == "sessions__run-1"
+    outside = session_name(str(tmp_path.parent / "elsewhere"), str(tmp_path))
+    assert outside.startswith("external__elsewhere-") and ".." not in outside
+    assert outside != session_name(str(tmp_path.parent / "other" / "elsewhere"), str(tmp_path))
+
+
+def test_create_file_rejects_paths_outside_the_session(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+
+    result = app.create_file_with_content("../escape.py", "print(1)\n", str(workdir))
+    assert result.startswith("Error creating file ../escape.py")
+    assert not (tmp_path / "escape.py").exists()
+
+    # Rewriting the same content reads the same, so replayed sessions produce identical prompts
+    first = app.create_file_with_content("tool.py", "x = 1\n", str(workdir))
+    assert first == "Successfully created tool.py with 6 characters"
+    assert app.create_file_with_content("tool.py", "x = 1\n", str(workdir)) == first
+    assert len(app.artifact_store.history(session_name(str(workdir), app.OUTPUT_DIR), "tool.py")) == 1
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+
+import app
+import batch_runner
+from artifact_store import ArtifactStore
+
+CANNED_RESPONSE = """filename: tool.py
+```python
+print("hello")
+```
+SOLUTION_COMPLETE"""
+
+
+def test_run_batch_isolates_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_response(prompt, **kwargs):
+        with lock:
+            in_flight.append(prompt)
+            peak.append(len(in_flight))
+        threading.Event().wait(0.01)  # time.sleep is patched out above
+        with lock:
+            in_flight.pop()
+        if kwargs.get("on_token"):
+            kwargs["on_token"](CANNED_RESPONSE)
+        return CANNED_RESPONSE
+
+    monkeypatch.setattr(app, "get_openrouter_response", fake_response)
+    results = batch_runner.run_batch(["Problem A", "Problem B", "Problem C"], concurrency=2)
+
+    assert [r["problem"] for r in results] == ["Problem A", "Problem B", "Problem C"]
+    assert all(r["status"] == "completed" for r in results)
+    assert len({r["output_dir"] for r in results}) == 3
+    assert max(peak) <= 2
+    for result in results:
+        assert os.path.exists(os.path.join(result["output_dir"], "tool.py"))
+        with open(os.path.join(result["output_dir"], "transcript.json")) as f:
+            assert json.load(f)["conversation"][0] == f"Problem to solve: {result['problem']}"
+
+
+def test_failed_session_is_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+
+    def failing_response(prompt, **kwargs):
+        raise ValueError("The request to OpenRouter timed out. Please try again later.")
+
+    monkeypatch.setattr(app, "get_openrouter_response", failing_response)
+    [result] = batch_runner.run_batch(["Problem A"], concurrency=1)
+    assert result["status"] == "failed"
+    assert "timed out" in result["error"]
+
+
+def test_load_problems_supports_text_and_jsonl(tmp_path):
+    text = tmp_path / "problems.txt"
+    text.write_text("# nightly\nFirst problem\n\nSecond problem\n")
+    jsonl = tmp_path / "problems.jsonl"
+    jsonl.write_text('{"problem": "First problem"}\n"Second problem"\n')
+    assert batch_runner.load_problems(str(text)) == ["First problem", "Second problem"]
+    assert batch_runner.load_problems(str(jsonl)) == ["First problem", "Second problem"]
+
+
+def test_max_turns_limits_the_conversation(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def endless_response(prompt, **kwargs):
+        calls.append(prompt)
+        return "Still working on it."
+
+    monkeypatch.setattr(app, "get_openrouter_response", endless_response)
+    [result] = batch_runner.run_batch(["Problem A"], concurrency=1, max_turns=2)
+    assert result["status"] == "completed"
+    assert len(calls) == 3  # Two turns and the final summary
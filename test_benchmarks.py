@@ -0,0 +1,39 @@
+import argparse
+
+from benchmarks import run_benchmarks
+from benchmarks.mock_openrouter import MockOpenRouter
+from openrouter_client import OpenRouterClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_mock_streams_canned_responses_and_rate_limits():
+    with MockOpenRouter(["first answer", "second answer"], rate_limit_every=2) as mock:
+        client = OpenRouterClient("test-key", mock.url, backoff_base=0.01)
+        stream = client.stream(MESSAGES)
+        assert list(stream) == ["firs", "t an", "swer"]
+        assert stream.usage["completion_tokens"] == 3
+        # The second request is rate limited, then retried
+        assert client.complete(MESSAGES) == "second answer"
+        assert len(mock.requests) == 3
+
+
+def test_benchmark_report_is_machine_readable():
+    options = argparse.Namespace(
+        scenarios=["parse_response", "conversation_pipelined"],
+        iterations=1,
+        conversations=1,
+        parse_mb=0.1,
+        latency=0,
+        tokens_per_second=0,
+        output=None,
+        compare=None,
+    )
+    report = run_benchmarks.run(options)
+    parse = report["scenarios"]["parse_response"]
+    conversation = report["scenarios"]["conversation_pipelined"]
+    assert parse["throughput_mb_per_s"] > 0 and parse["peak_memory_bytes"] > 0
+    assert conversation["turn_latency"]["count"] == 3
+    assert conversation["llm_latency"]["p95_ms"] >= conversation["llm_latency"]["p50_ms"]
+    assert conversation["requests"] == 4
+    assert run_benchmarks.compare(report, report)["parse_response.parse_response.p50_ms"] == 1.0
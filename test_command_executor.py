@@ -0,0 +1,146 @@
+import sys
+import time
+
+import app
+from command_executor import CommandExecutor, OutputBuffer, format_result, split_commands
+
+ALLOWED = ["echo", "ls", "mkdir", "python", "python3", "cat"]
+PYTHON = "python3" if sys.version_info[0] == 3 else "python"
+
+
+def executor_for(tmp_path, **kwargs):
+    return CommandExecutor(ALLOWED, [str(tmp_path)], **kwargs)
+
+
+def test_whitelist_and_directory_checks(tmp_path):
+    executor = executor_for(tmp_path)
+    cwd = str(tmp_path)
+    assert "not in whitelist" in executor.validate("whoami", cwd)
+    assert "not in whitelist" in executor.validate("echo hi && whoami", cwd)
+    assert "Access restricted" in executor.validate("cat /etc/passwd", cwd)
+    assert "Access restricted" in executor.validate("echo hi > ../outside.txt", cwd)
+    assert "Access restricted" in executor.validate(f"ls {tmp_path}-sibling/x", cwd)
+    assert "substitution" in executor.validate("echo $(whoami)", cwd)
+    assert "substitution" in executor.validate("echo `whoami`", cwd)
+    assert "expansion" in executor.validate("cat $HOME/.bashrc", cwd)
+    assert "expansion" in executor.validate('ls "${HOME}"', cwd)
+    assert executor.validate("echo 'Pricing: $19/month'", cwd) is None
+    assert executor.validate("mkdir -p build/out && ls build", cwd) is None
+
+
+def test_run_records_exit_code_and_duration(tmp_path):
+    executor = executor_for(tmp_path)
+    ok = executor.run("echo hello", str(tmp_path))
+    assert (ok.exit_code, ok.stdout, ok.timed_out) == (0, "hello\n", False)
+    failed = executor.run(f"{PYTHON} -c 'import sys; sys.exit(3)'", str(tmp_path))
+    assert failed.exit_code == 3 and failed.duration > 0
+    assert format_result(failed).startswith("Error:")
+
+
+def test_timeout_kills_process_group(tmp_path):
+    executor = executor_for(tmp_path, timeout=0.5)
+    started = time.monotonic()
+    script = "import subprocess, time; subprocess.Popen(['sleep', '30']); time.sleep(30)"
+    result = executor.run(f'{PYTHON} -c "{script}"', str(tmp_path))
+    assert result.timed_out
+    assert time.monotonic() - started < 10
+    assert format_result(result, executor.timeout).startswith("Error: Command timed out after 0.5s\n")
+
+
+def test_output_keeps_head_and_tail(tmp_path):
+    executor = executor_for(tmp_path, max_output=200)
+    script = "print('START'); print('x' * 100000); print('END')"
+    result = executor.run(f'{PYTHON} -c "{script}"', str(tmp_path))
+    assert result.stdout.startswith("START")
+    assert result.stdout.rstrip().endswith("END")
+    assert "bytes omitted" in result.stdout
+    assert len(result.stdout) < 400
+
+
+def test_output_buffer_small_writes():
+    buffer = OutputBuffer(10)
+    for byte in b"0123456789abcdefghij":
+        buffer.write(bytes([byte]))
+    assert buffer.text() == "01234\n[... 10 bytes omitted ...]\nfghij"
+
+    # A zero limit keeps nothing at all
+    buffer = OutputBuffer(0)
+    for byte in b"0123":
+        buffer.write(bytes([byte]))
+    assert buffer.text() == "\n[... 4 bytes omitted ...]\n"
+
+
+def test_only_read_only_commands_run_in_parallel(tmp_path, monkeypatch):
+    executor = executor_for(tmp_path)
+    commands = ["ls", "cat a.txt", "echo hi | grep h", "black --check x.py", "python gen.py", "ls", "echo hi > out.txt"]
+    assert [executor.is_read_only(c) for c in commands] == [True, True, True, True, False, True, False]
+    assert not executor.is_read_only("black x.py")
+    assert not executor.is_read_only("find . -name '*.tmp' -delete")
+
+    running = []
+    peak = []
+    real_run = executor.run
+
+    def slow_run(command, cwd):
+        running.append(command)
+        peak.append(len(running))
+        time.sleep(0.2)
+        running.remove(command)
+        return real_run("echo done", cwd)._replace(command=command)
+
+    monkeypatch.setattr(executor, "run", slow_run)
+    results = executor.run_all(commands, str(tmp_path))
+    assert [r.command for r in results] == commands
+    assert max(peak) == 4  # The four read-only commands before the first writer
+    assert peak[4:] == [1, 1, 1]
+
+
+def test_dependent_commands_run_in_order(tmp_path):
+    executor = executor_for(tmp_path)
+    (tmp_path / "gen.py").write_text("open('data.txt', 'w').write('generated')\n")
+    results = executor.run_all([f"{PYTHON} gen.py", "cat data.txt"], str(tmp_path))
+    assert results[1].stdout == "generated"
+
+
+def test_split_commands():
+    block = "# install\npip install \\\n  requests\n\npython app.py\n"
+    assert split_commands(block) == ["pip install requests", "python app.py"]
+
+    heredoc = "cat > notes.txt << EOF\nhello world\n# not a comment\nEOF\nls"
+    assert split_commands(heredoc) == ["cat > notes.txt << EOF\nhello world\n# not a comment\nEOF", "ls"]
+    quoted = 'python -c "\nfor i in range(2):\n    print(i)\n"\nls'
+    assert split_commands(quoted) == ['python -c "\nfor i in range(2):\n    print(i)\n"', "ls"]
+    # Cannot tell where the commands end, so bash gets the block as written
+    assert split_commands("echo 'one\nls\n") == ["echo 'one\nls"]
+
+
+def test_heredocs_and_multiline_quotes_run_as_one_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    block = f'cat > notes.txt << EOF\nhello world\nEOF\n{PYTHON} -c "\nfor i in range(2):\n    print(i)\n"'
+    [text] = app.execute_commands([block], output_dir=str(tmp_path))
+    assert (tmp_path / "notes.txt").read_text() == "hello world\n"
+    assert text.endswith("(exit 0)\n0\n1\n")
+
+    # Heredoc bodies are data, but every line of shell around them is still checked
+    executor = executor_for(tmp_path)
+    cwd = str(tmp_path)
+    assert executor.validate("cat << 'EOF'\nrm -rf $HOME\nEOF", cwd) is None
+    assert "substitution" in executor.validate("cat << EOF\n$(whoami)\nEOF", cwd)
+    assert "not in whitelist" in executor.validate("cat << EOF\nhi\nEOF\nwhoami", cwd)
+    assert "not in whitelist" in executor.validate("echo 'one\ntwo'\nwhoami", cwd)
+    assert "not in whitelist" in executor.validate("echo a#b; whoami", cwd)
+
+
+def test_background_children_do_not_hang_the_executor(tmp_path):
+    executor = executor_for(tmp_path, timeout=5)
+    started = time.monotonic()
+    result = executor.run(f"{PYTHON} -c 'import time; time.sleep(30)' & echo started", str(tmp_path))
+    assert result.stdout == "started\n"
+    assert time.monotonic() - started < 4
+
+
+def test_block_transcript_has_no_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    [text] = app.execute_commands(["echo one\necho two"], output_dir=str(tmp_path))
+    # Transcript text feeds the cache key, so it must not change from run to run
+    assert text == "$ echo one (exit 0)\none\n\n$ echo two (exit 0)\ntwo\n"
@@ -0,0 +1,65 @@
+from conversation_context import ConversationContext, estimate_tokens, summarize_entry
+
+INSTRUCTION = "Respond to the previous message."
+
+
+def total_tokens(messages):
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def test_roles_follow_the_speaker():
+    context = ConversationContext("Build a tool")
+    context.add_message("Analytica", "Plan A")
+    context.add_message("Creativa", "Plan B")
+    context.add_result("Command Result", "ok")
+    messages = context.build_messages("Analytica", INSTRUCTION)
+    assert messages[0]["role"] == "system" and "Build a tool" in messages[0]["content"]
+    assert messages[1] == {"role": "assistant", "content": "Plan A"}
+    assert messages[2] == {"role": "user", "content": "Creativa: Plan B"}
+    assert messages[3] == {"role": "user", "content": "Command Result: ok"}
+    assert messages[-1] == {"role": "user", "content": INSTRUCTION}
+
+
+def test_prompt_size_stays_flat_over_long_sessions():
+    context = ConversationContext("Build a tool", token_budget=2000, summary_budget=300)
+    sizes = []
+    for turn in range(200):
+        speaker = "Analytica" if turn % 2 == 0 else "Creativa"
+        context.add_message(speaker, f"Turn {turn} idea. " + "detail " * 150)
+        context.add_result("Command Result", "output line\n" * 20)
+        context.add_file(f"tool_{turn}.py")
+        sizes.append(total_tokens(context.build_messages(speaker, INSTRUCTION)))
+    assert max(sizes) <= 2000
+    assert max(sizes[100:]) - min(sizes[100:]) < 400
+    assert len(context.entries) < 10
+    system = context.build_messages("Analytica", INSTRUCTION)[0]["content"]
+    assert "older events omitted" in system
+    assert "tool_199.py" in system and "150 earlier files" in system
+
+
+def test_oversized_recent_entries_are_truncated():
+    context = ConversationContext("Build a tool", token_budget=1500, summary_budget=100)
+    context.add_message("Creativa", "x" * 100000)
+    messages = context.build_messages("Analytica", INSTRUCTION)
+    assert "characters omitted" in messages[1]["content"]
+    assert total_tokens(messages) <= 1500
+
+
+def test_custom_summarizer_is_incremental():
+    calls = []
+
+    def summarizer(previous, entries):
+        calls.append(len(entries))
+        return previous + "".join(e["content"][0] for e in entries)
+
+    context = ConversationContext("p", token_budget=600, summary_budget=100, summarizer=summarizer)
+    for turn in range(6):
+        context.add_message("Analytica", f"{turn}" + " word" * 200)
+        context.build_messages("Creativa", INSTRUCTION)
+    assert sum(calls) == 6 - len(context.entries)
+    assert context.summary_text.startswith("0123"[: sum(calls)])
+
+
+def test_summarize_entry_drops_code():
+    entry = {"kind": "message", "speaker": "Creativa", "content": "Here:\n```python\nprint(1)\n```\nDone"}
+    assert summarize_entry(entry) == "Creativa: Here: [code] Done"
@@ -1,4 +1,15 @@
 #!/usr/bin/env python3
+import app
+from app import create_file_with_content
+from artifact_store import ArtifactStore
+from response_parser import (
+    CommandBlock,
+    CompletionMarker,
+    FileBlock,
+    ResponseParser,
+    UnclosedBlock,
+    parse_response,
+)
 
 # Test the file creation functionality
 test_response = """
@@ -34,48 +45,62 @@ if __name__ == "__main__":
 This tool can be sold for $29/month to small businesses for email automation.
 """
 
-# Import the file creation function
-import sys
 
-sys.path.append(".")
-from app import create_file_with_content
+def test_parse_and_create_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    [event] = parse_response(test_response)
+    assert event.filename == "email_automation.py"
+    assert event.language == "python"
+    assert event.content.startswith("import smtplib")
+    assert event.content.endswith('"This is a test email.")')
+
+    file_result = create_file_with_content(event.filename, event.content, str(tmp_path))
+    assert file_result == f"Successfully created email_automation.py with {len(event.content)} characters"
+    assert (tmp_path / "email_automation.py").read_text() == event.content
+
+
+def test_multiple_files_and_commands():
+    response = """filename: `a.py`
+```python
+print("a")
+```
+Filename: b.py (helper)
+```python
+print("b")
+```
+```bash
+pip install requests
+python a.py
+```
+```python
+# filename: c.py
+print("c")
+```
+```bash ls -la```
+SOLUTION_COMPLETE"""
+    events = parse_response(response)
+    assert [e.filename for e in events if isinstance(e, FileBlock)] == ["a.py", "b.py", "c.py"]
+    assert [e.command for e in events if isinstance(e, CommandBlock)] == [
+        "pip install requests\npython a.py",
+        "ls -la",
+    ]
+    assert events[-1] == CompletionMarker()
+
+
+def test_streamed_chunks_emit_files_as_fences_close():
+    parser = ResponseParser()
+    response = "filename: a.py\n```python\nprint(1)\n```\nmore text\n```bash\nls\n```"
+    emitted = []
+    for i in range(0, len(response), 3):
+        for event in parser.feed(response[i : i + 3]):
+            emitted.append((i, event))
+    emitted.extend((len(response), event) for event in parser.close())
+    assert emitted[0][1] == FileBlock("a.py", "python", "print(1)")
+    assert emitted[0][0] < response.index("more text")
+    assert emitted[1][1] == CommandBlock("ls")
+
 
-# Test the parsing and file creation
-if "```python" in test_response and (
-    "filename:" in test_response.lower() or "**filename:" in test_response.lower()
-):
-    try:
-        # Extract filename - handle both formats
-        lines = test_response.split("\n")
-        filename = None
-        for line in lines:
-            if "filename:" in line.lower():
-                # Handle both "filename: file.py" and "**filename: file.py**"
-                filename_part = line.split(":")[1].strip()
-                filename = filename_part.replace("*", "").strip()
-                break
-
-        print(f"Extracted filename: {filename}")
-
-        if filename and filename.endswith(".py"):
-            # Extract Python code between ```python and ```
-            code_blocks = test_response.split("```python")
-            if len(code_blocks) > 1:
-                code_part = code_blocks[1]
-                code_end = code_part.find("```")
-                if code_end > 0:
-                    code_content = code_part[:code_end].strip()
-                    print(f"Extracted code length: {len(code_content)} characters")
-                    print(f"Code preview: {code_content[:100]}...")
-                    file_result = create_file_with_content(filename, code_content)
-                    print(f"File Creation Result: {file_result}")
-                else:
-                    print("Warning: Could not find end of code block")
-            else:
-                print("Warning: Could not find Python code block")
-        else:
-            print(f"Warning: Invalid or missing filename: {filename}")
-    except Exception as e:
-        print(f"Error processing file creation: {e}")
-else:
-    print("No file creation pattern found")
+def test_unterminated_fences_do_not_crash():
+    assert parse_response("Run this:\n```bash") == [UnclosedBlock(None, "bash")]
+    assert parse_response("filename: a.py\n```python\nprint(1)") == [UnclosedBlock("a.py", "python")]
+    assert parse_response("done SOLUTION_COMPLETE") == [CompletionMarker()]
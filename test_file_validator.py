@@ -0,0 +1,131 @@
+import os
+import sys
+
+from file_validator import FileValidator, format_checks, run_checks
+from turn_pipeline import TurnPipeline
+
+# Stand-in linter: counts its runs next to the file and rejects tabs
+FAKE_LINT = [
+    sys.executable,
+    "-c",
+    "import sys; open('lint_runs', 'a').write('x'); "
+    "sys.exit('tabs found' if '\\t' in open(sys.argv[1]).read() else 0)",
+]
+
+
+def is_running(pid):
+    """Whether pid is alive; an unreaped zombie counts as stopped"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+
+def check(tmp_path, filename, source, **kwargs):
+    path = tmp_path / filename
+    path.write_text(source)
+    return run_checks(str(path), source, ("syntax", "import"), {}, kwargs.get("timeout", 10))
+
+
+def test_syntax_error_skips_other_checks(tmp_path):
+    [result] = check(tmp_path, "broken.py", "def f(:\n    pass\n")
+    assert result.check == "syntax" and not result.passed
+    assert result.output.startswith("line 1:")
+
+
+def test_import_failure_reports_the_exception(tmp_path):
+    results = check(tmp_path, "needs_dep.py", "import not_a_real_module\n")
+    assert [r.passed for r in results] == [True, False]
+    assert results[1].output == "ModuleNotFoundError: No module named 'not_a_real_module'"
+    assert format_checks(results) == (
+        "Checks failed: import (passed: syntax)\n"
+        "  import: ModuleNotFoundError: No module named 'not_a_real_module'"
+    )
+
+
+def test_import_only_runs_import_time_code(tmp_path):
+    source = "import time\n\nif __name__ == '__main__':\n    time.sleep(30)\n"
+    assert all(r.passed for r in check(tmp_path, "script.py", source, timeout=5))
+    slow = check(tmp_path, "slow.py", "import time\ntime.sleep(30)\n", timeout=0.5)
+    assert slow[1].output == "timed out after 0.5s"
+
+
+def test_import_check_cannot_block_on_stdin_or_leave_children(tmp_path):
+    prompt = check(tmp_path, "prompt.py", "name = input('Name: ')\n", timeout=5)
+    assert prompt[1].output == "EOFError: EOF when reading a line"
+
+    source = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+        "open('child.pid', 'w').write(str(child.pid))\n"
+        "time.sleep(30)\n"
+    )
+    spawner = check(tmp_path, "spawner.py", source, timeout=3)
+    assert spawner[1].output == "timed out after 3s"
+    pid = int((tmp_path / "child.pid").read_text())
+    assert not is_running(pid)
+
+
+def test_checks_use_the_submitted_content_not_the_file_on_disk(tmp_path):
+    (tmp_path / "helpers.py").write_text("VALUE = 1\n")
+    path = tmp_path / "tool.py"
+    path.write_text("import not_there\n")  # Rewritten after this version was submitted
+    results = run_checks(str(path), "from helpers import VALUE\n", ("syntax", "import"), {}, 10)
+    assert all(r.passed for r in results)
+
+
+def test_results_are_cached_by_content(tmp_path):
+    validator = FileValidator(["fakelint"], linters={"fakelint": FAKE_LINT})
+    path = tmp_path / "tool.py"
+    try:
+        assert validator.checks == ("syntax", "import", "fakelint")
+        path.write_text("x = 1\n")
+        assert validator.submit(str(path), "x = 1\n").result() == "Checks passed: syntax, import, fakelint"
+        assert validator.submit(str(path), "x = 1\n").result() == "Checks passed: syntax, import, fakelint"
+        assert (tmp_path / "lint_runs").read_text() == "x"
+
+        path.write_text("if True:\n\tx = 1\n")
+        summary = validator.submit(str(path), "if True:\n\tx = 1\n").result()
+        assert summary.splitlines()[1] == "  fakelint: tabs found"
+        assert validator.stats()["hits"] == 1 and validator.stats()["misses"] == 2
+    finally:
+        validator.close()
+
+
+def test_linters_must_be_whitelisted(tmp_path):
+    validator = FileValidator([], linters={"fakelint": FAKE_LINT})
+    assert validator.checks == ("syntax", "import")
+    validator.close()
+
+
+def test_pipeline_appends_check_summary_to_file_result(tmp_path):
+    validator = FileValidator([])
+
+    def write_file(filename, content, output_dir):
+        if filename == "bad.py":
+            return f"Error creating file {filename}: denied"
+        (tmp_path / filename).write_text(content)
+        return f"Successfully created {filename}"
+
+    def check_file(filename, content, output_dir, result):
+        if not result.startswith("Successfully"):
+            return None
+        return validator.submit(str(tmp_path / filename), content)
+
+    turns = TurnPipeline(write_file, None, str(tmp_path), check_file=check_file)
+    turns.submit_file("good.py", "x = 1\n")
+    turns.submit_file("bad.py", "x = 1\n")
+    turns.end_turn()
+    assert turns.collect_files() == [
+        ("good.py", "Successfully created good.py\nChecks passed: syntax, import"),
+        ("bad.py", "Error creating file bad.py: denied"),
+    ]
+    turns.close()
+    validator.close()
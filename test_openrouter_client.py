@@ -0,0 +1,148 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openrouter_client import OpenRouterClient, retry_after_seconds
+
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    tokens = ["Hello", ", ", "world"]
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        if self.server.rate_limited:
+            self.server.rate_limited -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not body.get("stream"):
+            payload = json.dumps({"choices": [{"message": {"content": "".join(self.tokens)}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        for token in self.tokens:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        usage = {"choices": [{"delta": {}}], "usage": {"prompt_tokens": 3, "completion_tokens": 3}}
+        self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ChunkedStreamingHandler(StreamingHandler):
+    """Keep-alive HTTP/1.1 variant that sends the stream as a chunked body, like OpenRouter"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.server.ports.add(self.client_address[1])
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"choices": [{"delta": {"content": token}}]} for token in self.tokens]
+        for data in [json.dumps(event).encode() for event in events] + [b"[DONE]"]:
+            self._chunk(b"data: " + data + b"\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StreamingHandler)
+    httpd.requests = []
+    httpd.rate_limited = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def client_for(server, **kwargs):
+    return OpenRouterClient("test-key", f"http://127.0.0.1:{server.server_port}/", **kwargs)
+
+
+def test_stream_yields_tokens_and_reports_ttft(server):
+    client = client_for(server)
+    stream = client.stream([{"role": "user", "content": "hi"}])
+    assert list(stream) == ["Hello", ", ", "world"]
+    assert stream.text == "Hello, world"
+    assert stream.ttft is not None and stream.ttft <= stream.duration
+    assert stream.usage == {"prompt_tokens": 3, "completion_tokens": 3}
+    assert server.requests[0]["stream"] is True
+
+
+def test_complete_and_stream_share_one_client(server):
+    client = client_for(server)
+    messages = [{"role": "user", "content": "hi"}]
+    assert client.complete(messages) == "Hello, world"
+    assert client.stream(messages).read() == "Hello, world"
+    assert len(server.requests) == 2
+
+
+def test_rate_limited_requests_are_retried(server):
+    server.rate_limited = 2
+    client = client_for(server, backoff_base=0.01)
+    assert client.complete([{"role": "user", "content": "hi"}]) == "Hello, world"
+    assert len(server.requests) == 3
+
+
+def test_rate_limit_gives_up_after_max_retries(server):
+    server.rate_limited = 5
+    client = client_for(server, max_retries=1, backoff_base=0.01)
+    with pytest.raises(ValueError, match="429"):
+        client.complete([{"role": "user", "content": "hi"}])
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("2") == 2.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_missing_api_key_raises_value_error():
+    client = OpenRouterClient("", "http://127.0.0.1:9/")
+    with pytest.raises(ValueError, match="API key is missing"):
+        client.complete([{"role": "user", "content": "hi"}])
+
+
+def test_connection_errors_become_value_errors():
+    client = OpenRouterClient("test-key", "http://127.0.0.1:9/", connect_timeout=1)
+    with pytest.raises(ValueError, match="OpenRouter"):
+        client.complete([{"role": "user", "content": "hi"}])
+
+
+def test_streams_reuse_one_keep_alive_connection():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ChunkedStreamingHandler)
+    httpd.requests = []
+    httpd.ports = set()
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        client = client_for(httpd)
+        for i in range(5):
+            assert client.stream([{"role": "user", "content": f"hi {i}"}]).read() == "Hello, world"
+        assert len(httpd.ports) == 1
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openrouter_client import OpenRouterClient
+from response_cache import ReplayLog, ResponseCache, cache_key
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_cache_key_is_stable_and_param_sensitive():
+    assert cache_key("m", MESSAGES, {"temperature": 0.1, "top_p": 1}) == cache_key(
+        "m", MESSAGES, {"top_p": 1, "temperature": 0.1}
+    )
+    assert cache_key("m", MESSAGES) != cache_key("m", MESSAGES, {"temperature": 0.1})
+    assert cache_key("m", MESSAGES) != cache_key("other", MESSAGES)
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get("a") is None
+    cache.put("a", "hello", {"completion_tokens": 1})
+    assert cache.get("a") == "hello"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    reopened = ResponseCache(str(tmp_path))
+    assert reopened.get("a") == "hello"
+
+
+def test_evicts_least_recently_used_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.evictions == 1
+    assert not os.path.exists(tmp_path / "b.json")
+
+
+def test_evicts_by_size_and_age(tmp_path):
+    cache = ResponseCache(str(tmp_path / "size"), max_bytes=200)
+    cache.put("a", "x" * 100)
+    cache.put("b", "y" * 100)
+    assert cache.get("a") is None and cache.get("b") is not None
+
+    aged = ResponseCache(str(tmp_path / "age"), max_age=60)
+    aged.put("a", "old")
+    old = time.time() - 120
+    os.utime(tmp_path / "age" / "a.json", (old, old))
+    assert aged.get("a") is None
+
+
+def test_replay_is_strict_and_record_appends(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    key = cache_key("m", MESSAGES)
+    recorder = ReplayLog(path, mode="record")
+    assert recorder.get(key) is None
+    recorder.record(key, "m", MESSAGES, {}, "recorded answer")
+
+    replay = ReplayLog(path)
+    assert replay.get(key) == "recorded answer"
+    with pytest.raises(ValueError, match="No recorded completion"):
+        replay.get(cache_key("m", [{"role": "user", "content": "unseen"}]))
+
+
+def test_client_serves_replay_without_network_or_api_key(tmp_path):
+    path = tmp_path / "recordings.jsonl"
+    path.write_text('{"model": "m", "messages": [{"role": "user", "content": "hi"}], "content": "offline"}\n')
+    client = OpenRouterClient(None, "http://127.0.0.1:9/", replay=ReplayLog(str(path)))
+    assert client.complete(MESSAGES, model="m") == "offline"
+    assert client.stream(MESSAGES, model="m").read() == "offline"
+    with pytest.raises(ValueError, match="No recorded completion"):
+        client.complete(MESSAGES, model="other")
+
+
+def test_record_mode_records_cache_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    cache.put(cache_key("m", MESSAGES, {}), "cached answer")
+    path = str(tmp_path / "recordings.jsonl")
+    client = OpenRouterClient(None, "http://127.0.0.1:9/", cache=cache, replay=ReplayLog(path, mode="record"))
+    assert client.stream(MESSAGES, model="m").read() == "cached answer"
+
+    replay = OpenRouterClient(None, "http://127.0.0.1:9/", replay=ReplayLog(path))
+    assert replay.stream(MESSAGES, model="m").read() == "cached answer"
+
+
+class TruncatedStreamHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        # The connection drops before [DONE]
+        self.wfile.write(b'data: {"choices": [{"delta": {"content": "Half an ans"}}]}\n\n')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_truncated_stream_is_not_cached(tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), TruncatedStreamHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    cache = ResponseCache(str(tmp_path / "cache"))
+    try:
+        client = OpenRouterClient("test-key", f"http://127.0.0.1:{httpd.server_port}/", cache=cache)
+        assert client.stream(MESSAGES, model="m").read() == "Half an ans"
+        assert cache.get(cache_key("m", MESSAGES, {})) is None
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import app
+from artifact_store import ArtifactStore
+from session_journal import JOURNAL_DIR_NAME, SessionJournal, Transcript, find_journal, read_records
+
+RESPONSE = """filename: tool.py
+```python
+print("hi")
+```
+```bash
+echo hi
+```
+SOLUTION_COMPLETE"""
+
+
+def test_transcript_spills_older_entries(tmp_path):
+    transcript = Transcript(keep=3)
+    for i in range(10):
+        transcript.append(f"entry {i}")
+
+    assert len(transcript._recent) == 3
+    assert len(transcript) == 10
+    assert transcript[0] == "entry 0"
+    assert transcript[-1] == "entry 9"
+    assert transcript[2:5] == ["entry 2", "entry 3", "entry 4"]
+    assert list(transcript) == [f"entry {i}" for i in range(10)]
+    with pytest.raises(IndexError):
+        transcript[10]
+
+
+def test_torn_last_line_is_skipped_and_repaired(tmp_path):
+    journal = SessionJournal.create(str(tmp_path / JOURNAL_DIR_NAME))
+    journal.append({"type": "start", "problem": "p"})
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "turn", "respo')
+
+    assert [r["type"] for r in read_records(journal.path)] == ["start"]
+    reopened = SessionJournal(journal.path)
+    reopened.append({"type": "final", "response": "done"})
+    reopened.close()
+    assert [r["type"] for r in read_records(journal.path)] == ["start", "final"]
+    assert find_journal(reopened.session_id, str(tmp_path)) == journal.path
+
+
+@pytest.mark.parametrize("pipelined,wait_for", [(False, "commands"), (True, "none")])
+def test_resume_continues_without_repeating_llm_calls(tmp_path, monkeypatch, pipelined, wait_for):
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    calls = []
+
+    def fake_response(prompt, fail_on=None, **kwargs):
+        if len(calls) == fail_on:
+            raise ValueError("OpenRouter API error: connection reset")
+        calls.append(kwargs["messages"])
+        if kwargs.get("on_token"):
+            kwargs["on_token"](RESPONSE)
+        return RESPONSE
+
+    def run(name, fail_on=None):
+        output_dir = tmp_path / name
+        output_dir.mkdir(exist_ok=True)
+        monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / name / ".artifacts")))
+        monkeypatch.setattr(app, "get_openrouter_response", lambda p, **kw: fake_response(p, fail_on, **kw))
+        return app.ai_conversation(
+            "Problem", output_dir=str(output_dir), stream_output=False, pipelined=pipelined, wait_for=wait_for
+        )
+
+    expected = list(run("uninterrupted"))
+    calls.clear()
+
+    with pytest.raises(ValueError, match="connection reset"):
+        run("crashed", fail_on=2)
+    assert len(calls) == 2
+    [journal_path] = (tmp_path / "crashed" / JOURNAL_DIR_NAME).iterdir()
+    monkeypatch.setattr(app, "get_openrouter_response", fake_response)
+
+    conversation = app.resume_conversation(journal_path.stem, stream_output=False)
+    assert len(calls) == 4  # Only the third turn and the final summary were requested again
+    assert list(conversation) == expected
+
+    # A finished session resumes straight to its transcript
+    assert list(app.resume_conversation(str(journal_path), stream_output=False)) == expected
+    assert len(calls) == 4
+    types = [json.loads(line)["type"] for line in journal_path.read_text().splitlines()]
+    assert types.count("turn") == 3 and types.count("final") == 1
+
+
+def test_crash_journals_side_effects_that_already_ran(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    response = RESPONSE.replace("echo hi", "echo ran >> runs.txt")
+    attempts = []
+
+    def fake_response(prompt, **kwargs):
+        attempts.append(prompt)
+        if len(attempts) == 2:
+            raise ValueError("OpenRouter API error: connection reset")
+        if kwargs.get("on_token"):
+            kwargs["on_token"](response)
+        return response
+
+    monkeypatch.setattr(app, "get_openrouter_response", fake_response)
+    with pytest.raises(ValueError, match="connection reset"):
+        app.ai_conversation("Problem", output_dir=str(tmp_path), stream_output=False, pipelined=True, wait_for="none")
+    assert (tmp_path / "runs.txt").read_text() == "ran\n"
+
+    [journal_path] = (tmp_path / JOURNAL_DIR_NAME).iterdir()
+    conversation = app.resume_conversation(journal_path.stem, stream_output=False)
+    # Turn 0's command ran before the crash and must not run again on resume
+    assert (tmp_path / "runs.txt").read_text() == "ran\n" * 3
+    assert sum(entry.startswith("Command Result") for entry in conversation) == 3
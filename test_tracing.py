@@ -0,0 +1,86 @@
+import json
+import urllib.request
+
+import pytest
+
+import app
+from artifact_store import ArtifactStore
+from benchmarks.mock_openrouter import MockOpenRouter
+from tracing import Tracer, load_events, summarize
+
+
+def test_spans_nest_and_carry_bound_attributes(tmp_path):
+    tracer = Tracer(str(tmp_path / "events.jsonl"), str(tmp_path / "metrics.prom"))
+    with tracer.context(session="s1"):
+        with tracer.span("turn", turn=0):
+            with tracer.span("llm") as span:
+                span["prompt_tokens"] = 10
+                span["completion_tokens"] = 5
+            tracer.record("parse", 0.01, parent="llm")
+    with pytest.raises(ValueError):
+        with tracer.span("llm"):
+            raise ValueError("boom")
+    tracer.close()
+
+    events = load_events(str(tmp_path / "events.jsonl"))
+    assert [e["name"] for e in events] == ["llm", "parse", "turn", "llm"]
+    assert events[0]["parent"] == "turn" and events[0]["session"] == "s1"
+    assert events[1]["parent"] == "llm"
+    assert events[3]["error"] == "ValueError: boom" and "session" not in events[3]
+
+    metrics = (tmp_path / "metrics.prom").read_text()
+    assert 'twins_span_duration_seconds_count{span="llm"} 2' in metrics
+    assert 'twins_span_errors_total{span="llm"} 1' in metrics
+    assert 'twins_llm_tokens_total{type="prompt"} 10' in metrics
+
+
+def test_metrics_endpoint():
+    tracer = Tracer()
+    with tracer.span("command"):
+        pass
+    port = tracer.serve_metrics(0)
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert 'twins_span_duration_seconds_count{span="command"} 1' in response.read().decode()
+    tracer.close()
+
+
+def test_conversation_trace_summarizes_critical_path(tmp_path, monkeypatch):
+    tracer = Tracer(str(tmp_path / "events.jsonl"))
+    monkeypatch.setattr(app, "tracer", tracer)
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    with MockOpenRouter() as mock:
+        monkeypatch.setattr(app.openrouter_client, "url", mock.url)
+        monkeypatch.setattr(app.openrouter_client, "api_key", "test-key")
+        monkeypatch.setattr(app.openrouter_client, "cache", None)
+        monkeypatch.setattr(app.openrouter_client, "replay", None)
+        app.ai_conversation("Problem", output_dir=str(tmp_path), stream_output=False)
+    tracer.close()
+
+    events = load_events(str(tmp_path / "events.jsonl"))
+    names = {e["name"] for e in events}
+    assert {"conversation", "turn", "llm", "parse", "file_write", "commands", "command", "sleep", "wait"} <= names
+    summary = summarize(events)
+    session = summary["sessions"][str(tmp_path)]
+    assert session["turns"] == 3
+    assert session["tokens"]["completion_tokens"] > 0
+    assert set(session["critical_path"]) >= {"llm", "wait", "sleep", "other"}
+    assert abs(sum(session["critical_path"].values()) - session["wall_seconds"]) < 0.05
+    assert summary["spans"]["llm"]["count"] == 4
+    json.dumps(summary)
+
+
+def test_failed_conversation_still_writes_metrics(tmp_path, monkeypatch):
+    tracer = Tracer(metrics_path=str(tmp_path / "metrics.prom"))
+    monkeypatch.setattr(app, "tracer", tracer)
+
+    def failing_response(prompt, **kwargs):
+        raise ValueError("OpenRouter API error: connection reset")
+
+    monkeypatch.setattr(app, "get_openrouter_response", failing_response)
+    with pytest.raises(ValueError):
+        app.ai_conversation("Problem", output_dir=str(tmp_path), stream_output=False)
+
+    metrics = (tmp_path / "metrics.prom").read_text()
+    assert 'twins_span_errors_total{span="conversation"} 1' in metrics
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import app
+from artifact_store import ArtifactStore
+from turn_pipeline import TurnPipeline
+
+RESPONSE = """filename: tool.py
+```python
+print("hi")
+```
+```bash
+python tool.py
+```
+SOLUTION_COMPLETE"""
+
+
+def test_side_effects_run_in_order_on_worker():
+    calls = []
+    release = threading.Event()
+
+    def write_file(filename, content, output_dir):
+        calls.append(("write", filename))
+        return f"Successfully created {filename}"
+
+    def run_commands(commands, is_destructive, output_dir):
+        release.wait(5)
+        calls.append(("run", commands))
+        return ["ok"]
+
+    turns = TurnPipeline(write_file, run_commands, wait_for="files")
+    turns.submit_file("a.py", "x")
+    turns.submit_commands(["python a.py"])
+    turns.end_turn()
+    # The next prompt only needs the file writes, so it doesn't wait on the slow command
+    assert turns.collect_for_prompt() == ([("a.py", "Successfully created a.py")], [])
+    release.set()
+    assert turns.collect_all() == ([], ["ok"])
+    assert calls == [("write", "a.py"), ("run", ["python a.py"])]
+    turns.close()
+
+
+def test_rejects_unknown_wait_policy():
+    with pytest.raises(ValueError, match="wait policy"):
+        TurnPipeline(None, None, wait_for="sometimes")
+
+
+@pytest.mark.parametrize("pipelined,wait_for", [(False, "commands"), (True, "commands"), (True, "none")])
+def test_transcript_order_is_deterministic(tmp_path, monkeypatch, pipelined, wait_for):
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(app.command_executor, "allowed_dirs", [str(tmp_path)])
+    monkeypatch.setattr(app, "artifact_store", ArtifactStore(str(tmp_path / ".artifacts")))
+    prompts = []
+
+    def fake_response(prompt, **kwargs):
+        prompts.append(kwargs["messages"])
+        if kwargs.get("on_token"):
+            kwargs["on_token"](RESPONSE)
+        return RESPONSE
+
+    monkeypatch.setattr(app, "get_openrouter_response", fake_response)
+    conversation = app.ai_conversation(
+        "Problem", output_dir=str(tmp_path), stream_output=False, pipelined=pipelined, wait_for=wait_for
+    )
+    kinds = [entry.split(":")[0] for entry in conversation]
+    assert kinds == ["Problem to solve"] + [
+        "Analytica", "File Creation Result", "Command Result",
+        "Creativa", "File Creation Result", "Command Result",
+        "Analytica", "File Creation Result", "Command Result",
+        "Analytica (Final Solution)",
+    ]
+    assert conversation[3] == "Command Result: hi\n"
+    second_prompt = " ".join(m["content"] for m in prompts[1])
+    assert ("Command Result" in second_prompt) == (wait_for == "commands")
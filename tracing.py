@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens")
+
+
+class Tracer:
+    """Record timed spans to a JSONL event log and aggregate them into Prometheus metrics.
+
+    Spans nest per thread: each event names its parent span, and attributes bound with
+    context() (session, turn, speaker) are added to every span opened on that thread.
+    """
+
+    def __init__(self, path=None, metrics_path=None):
+        self.path = path
+        self.metrics_path = metrics_path
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._durations = defaultdict(lambda: [0, 0.0])  # span name -> [count, seconds]
+        self._errors = defaultdict(int)
+        self._tokens = defaultdict(int)
+        self._server = None
+
+    def _state(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+            self._local.attrs = {}
+        return self._local
+
+    @contextmanager
+    def context(self, **attrs):
+        """Attach attrs to every span opened on this thread inside the block"""
+        state = self._state()
+        saved = state.attrs
+        state.attrs = {**saved, **attrs}
+        try:
+            yield
+        finally:
+            state.attrs = saved
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time a block; the yielded dict can be filled with attributes known only at the end"""
+        state = self._state()
+        parent = state.stack[-1] if state.stack else None
+        state.stack.append(name)
+        started = time.time()
+        clock = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            state.stack.pop()
+            self._emit(name, started, time.perf_counter() - clock, parent, attrs, error)
+
+    def record(self, name, duration, parent=None, **attrs):
+        """Log a span measured elsewhere, e.g. work spread across many small callbacks"""
+        state = self._state()
+        if parent is None and state.stack:
+            parent = state.stack[-1]
+        self._emit(name, time.time() - duration, duration, parent, attrs, None)
+
+    def _emit(self, name, started, duration, parent, attrs, error):
+        event = {
+            "type": "span",
+            "run": self.run_id,
+            "name": name,
+            "start": round(started, 6),
+            "duration": round(duration, 6),
+            "parent": parent,
+            "thread": threading.current_thread().name,
+            **self._state().attrs,
+            **attrs,
+        }
+        if error:
+            event["error"] = error
+        with self._lock:
+            totals = self._durations[name]
+            totals[0] += 1
+            totals[1] += duration
+            if error:
+                self._errors[name] += 1
+            for field in TOKEN_FIELDS:
+                if isinstance(attrs.get(field), int):
+                    self._tokens[field] += attrs[field]
+            if self._file:
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP twins_span_duration_seconds Time spent in each instrumented operation.",
+            "# TYPE twins_span_duration_seconds summary",
+        ]
+        with self._lock:
+            for name, (count, seconds) in sorted(self._durations.items()):
+                lines.append(f'twins_span_duration_seconds_sum{{span="{name}"}} {seconds:.6f}')
+                lines.append(f'twins_span_duration_seconds_count{{span="{name}"}} {count}')
+            lines.append("# HELP twins_span_errors_total Instrumented operations that raised.")
+            lines.append("# TYPE twins_span_errors_total counter")
+            for name, count in sorted(self._errors.items()):
+                lines.append(f'twins_span_errors_total{{span="{name}"}} {count}')
+            lines.append("# HELP twins_llm_tokens_total Tokens reported by OpenRouter usage.")
+            lines.append("# TYPE twins_llm_tokens_total counter")
+            for field in TOKEN_FIELDS:
+                kind = field.split("_")[0]
+                lines.append(f'twins_llm_tokens_total{{type="{kind}"}} {self._tokens[field]}')
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        """Atomically rewrite the Prometheus text file, if one is configured"""
+        if not self.metrics_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.metrics_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.metrics_path)
+
+    def serve_metrics(self, port, host="127.0.0.1"):
+        """Expose /metrics on a local port from a daemon thread"""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = tracer.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        self.write_metrics()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+# Summaries of a recorded event log
+
+
+def load_events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(events):
+    """Per-session critical path and token spend, plus totals for every span name"""
+    spans = [e for e in events if e.get("type") == "span"]
+    sessions = {}
+    for event in spans:
+        session = sessions.setdefault(
+            event.get("session", "-"),
+            {"wall_seconds": 0.0, "critical_path": defaultdict(float), "tokens": defaultdict(int), "turns": 0},
+        )
+        if event["name"] == "conversation":
+            session["wall_seconds"] += event["duration"]
+        elif event["name"] == "turn":
+            session["turns"] += 1
+        # What the conversation thread itself was blocked on, turn by turn
+        if event.get("parent") in ("turn", "conversation") and event["name"] != "turn":
+            session["critical_path"][event["name"]] += event["duration"]
+        if event["name"] == "llm":
+            for field in TOKEN_FIELDS:
+                session["tokens"][field] += event.get(field) or 0
+
+    for session in sessions.values():
+        accounted = sum(session["critical_path"].values())
+        session["critical_path"]["other"] = max(session["wall_seconds"] - accounted, 0.0)
+        session["critical_path"] = dict(session["critical_path"])
+        session["tokens"] = dict(session["tokens"])
+
+    durations = defaultdict(list)
+    for event in spans:
+        durations[event["name"]].append(event["duration"])
+    totals = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        totals[name] = {
+            "count": len(values),
+            "total_seconds": round(sum(values), 3),
+            "p50_seconds": round(values[len(values) // 2], 3),
+            "p95_seconds": round(values[min(int(len(values) * 0.95), len(values) - 1)], 3),
+        }
+    return {"sessions": sessions, "spans": totals}
+
+
+def format_summary(summary):
+    lines = []
+    for session, data in summary["sessions"].items():
+        wall = data["wall_seconds"]
+        lines.append(f"Session {session}: {wall:.2f}s over {data['turns']} turns")
+        for name, seconds in sorted(data["critical_path"].items(), key=lambda item: -item[1]):
+            share = 100 * seconds / wall if wall else 0
+            lines.append(f"  {name:<12} {seconds:8.2f}s  {share:5.1f}%")
+        tokens = data["tokens"]
+        lines.append(
+            f"  tokens: {tokens.get('prompt_tokens', 0)} prompt, {tokens.get('completion_tokens', 0)} completion"
+        )
+    lines.append("All spans:")
+    for name, stats in summary["spans"].items():
+        lines.append(
+            f"  {name:<12} n={stats['count']:<5} total={stats['total_seconds']:.2f}s "
+            f"p50={stats['p50_seconds']:.3f}s p95={stats['p95_seconds']:.3f}s"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Twins trace: critical path and token spend")
+    parser.add_argument("events", help="JSONL event log written with TWINS_TRACE_FILE")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = summarize(load_events(args.events))
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# What the next speaker's prompt must wait for from the previous turn's side effects
+WAIT_POLICIES = ("commands", "files", "none")
+
+
+def completed_future(fn, *args):
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class TurnPipeline:
+    """Run each turn's file writes and commands on a worker while the next request is in flight.
+
+    A single worker thread keeps side effects in submission order. Results are handed
+    back per turn, so the transcript order never depends on timing:
+    response N, results of turn N, response N+1.
+    """
+
+    def __init__(
+        self, write_file, run_commands, output_dir=None, wait_for="commands", background=True, check_file=None
+    ):
+        if wait_for not in WAIT_POLICIES:
+            raise ValueError(f"Unknown wait policy '{wait_for}', expected one of {WAIT_POLICIES}")
+        self.write_file = write_file  # callable(filename, content, output_dir) -> result text
+        self.run_commands = run_commands  # callable(commands, is_destructive, output_dir) -> [result text]
+        # Optional callable(filename, content, output_dir, write result) -> Future of check text, or None
+        self.check_file = check_file
+        self.output_dir = output_dir
+        self.wait_for = wait_for
+        self._worker = ThreadPoolExecutor(max_workers=1) if background else None
+        self._current = {"files": [], "commands": None}
+        self._pending = {"files": [], "commands": None}
+
+    def _submit(self, fn, *args):
+        if self._worker is None:
+            return completed_future(fn, *args)
+        return self._worker.submit(fn, *args)
+
+    def submit_file(self, filename, content):
+        future = self._submit(self.write_file, filename, content, self.output_dir)
+        if self.check_file:
+            future = self._then_check(future, filename, content)
+        self._current["files"].append((filename, future))
+
+    def _then_check(self, written, filename, content):
+        """Future for the write result followed by its check summary.
+
+        Checks start as soon as each write lands and never hold up the worker, so the
+        checks of a turn's files overlap each other and the turn's commands.
+        """
+        checked = Future()
+
+        def on_checked(check):
+            if check.exception():
+                checked.set_exception(check.exception())
+            else:
+                checked.set_result(f"{written.result()}\n{check.result()}")
+
+        def on_written(_):
+            try:
+                check = self.check_file(filename, content, self.output_dir, written.result())
+            except Exception as e:
+                checked.set_exception(e)
+                return
+            if check is None:
+                checked.set_result(written.result())
+            else:
+                check.add_done_callback(on_checked)
+
+        written.add_done_callback(on_written)
+        return checked
+
+    def submit_commands(self, commands, is_destructive=False):
+        self._current["commands"] = self._submit(
+            self.run_commands, commands, is_destructive, self.output_dir
+        )
+
+    def current_files(self):
+        """Filenames submitted so far in the current turn"""
+        return [filename for filename, _ in self._current["files"]]
+
+    def end_turn(self):
+        """Hand the current turn's side effects over to be collected by the next turn"""
+        self._pending = self._current
+        self._current = {"files": [], "commands": None}
+
+    def collect_files(self):
+        """Block for the previous turn's file writes; returns [(filename, result)] once"""
+        files = [(filename, future.result()) for filename, future in self._pending["files"]]
+        self._pending["files"] = []
+        return files
+
+    def collect_commands(self):
+        """Block for the previous turn's commands; returns their results once"""
+        future = self._pending["commands"]
+        self._pending["commands"] = None
+        return future.result() if future else []
+
+    def collect_for_prompt(self):
+        """Results the next prompt depends on under the wait policy"""
+        if self.wait_for == "none":
+            return [], []
+        files = self.collect_files()
+        commands = self.collect_commands() if self.wait_for == "commands" else []
+        return files, commands
+
+    def collect_all(self):
+        return self.collect_files(), self.collect_commands()
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.shutdown(wait=True)